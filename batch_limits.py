@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+import os
+import json
+import time
+import signal
+import shutil
+from datetime import datetime
+
+# Per-file budgets for batch runs; 0 disables a limit
+DEFAULT_TIMEOUT = 300
+DEFAULT_MAX_RSS_MB = 2048
+
+# Seconds past the timeout before a worker that doesn't react to its alarm is killed
+KILL_GRACE = 5
+# How often worker RSS is checked, in seconds
+RSS_POLL_INTERVAL = 0.25
+# Files a worker converts before it is replaced, so heap fragmentation can't build up
+TASKS_PER_WORKER = 100
+
+REASON_SUFFIX = ".reason.json"
+
+class TimeLimitExceeded(Exception):
+    """Raised in a worker whose file ran past its time budget."""
+
+def failure_kind(exc):
+    """Classify an exception raised while converting a file: 'timeout', 'memory' or 'error'."""
+    if isinstance(exc, TimeLimitExceeded):
+        return 'timeout'
+    if isinstance(exc, MemoryError):
+        return 'memory'
+    return 'error'
+
+def describe_error(exc):
+    """One-line description of an exception for the batch log and reason records."""
+    return f"{type(exc).__name__}: {exc}" if str(exc) else type(exc).__name__
+
+def can_limit():
+    """True if files can be converted in forked worker processes with resource limits."""
+    try:
+        import resource  # noqa: F401
+    except ImportError:
+        return False
+    return hasattr(os, 'fork') and hasattr(signal, 'SIGALRM')
+
+def _alarm(signum, frame):
+    raise TimeLimitExceeded("time budget exceeded")
+
+def limit_memory(max_rss_mb=DEFAULT_MAX_RSS_MB):
+    """Cap the calling process's heap at ``max_rss_mb`` with RLIMIT_DATA, so allocations past it raise MemoryError."""
+    import resource
+
+    limit = max_rss_mb * 1024 * 1024
+    _, hard = resource.getrlimit(resource.RLIMIT_DATA)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_DATA, (limit, hard))
+
+def _rss_mb(pid):
+    """Current resident set size of a process in MB, or None where /proc is not available."""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+def _worker_loop(conn, timeout, max_rss_mb, initializer=None):
+    """Worker: run ``(func, args)`` tasks from conn until None arrives, each under a SIGALRM of ``timeout``."""
+    if max_rss_mb:
+        limit_memory(max_rss_mb)
+    if initializer is not None:
+        initializer()
+    signal.signal(signal.SIGALRM, _alarm)
+    while True:
+        task = conn.recv()
+        if task is None:
+            break
+        func, args = task
+        try:
+            if timeout:
+                signal.setitimer(signal.ITIMER_REAL, timeout)
+            message = (func(*args), None)
+        except Exception as e:
+            message = (None, (failure_kind(e), describe_error(e)))
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        conn.send(message)
+
+class Worker:
+    """A worker process running _worker_loop, and the task it is running, if any."""
+
+    def __init__(self, context, timeout, max_rss_mb, initializer=None):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_loop, args=(child_conn, timeout, max_rss_mb, initializer),
+                                       daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.timeout = timeout
+        self.key = None
+        self.start = None
+        self.deadline = None
+        self.tasks = 0
+
+    def assign(self, key, func, args):
+        self.key = key
+        self.start = time.monotonic()
+        self.deadline = self.start + self.timeout + KILL_GRACE if self.timeout else None
+        self.tasks += 1
+        self.conn.send((func, args))
+
+    def finish(self):
+        """Mark the worker idle; returns the key of the task it ran and how long it took."""
+        key, seconds = self.key, time.monotonic() - self.start
+        self.key = None
+        return key, seconds
+
+    def stop(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+def run_limited(tasks, jobs, timeout=DEFAULT_TIMEOUT, max_rss_mb=DEFAULT_MAX_RSS_MB):
+    """Run ``(key, func, args)`` tasks in ``jobs`` forked worker processes, each task under a time and memory budget.
+
+    Workers are forked from this process, so the modules already imported
+    here are not loaded again. Each task gets ``timeout`` seconds, after which
+    a SIGALRM raises TimeLimitExceeded in the worker; a worker still busy
+    ``KILL_GRACE`` seconds later (stuck outside the interpreter), or whose RSS
+    goes past ``max_rss_mb``, is killed. Worker heaps are capped at
+    ``max_rss_mb`` as well. A worker is replaced whenever ``func`` raises
+    (including TimeLimitExceeded and MemoryError, which task functions should
+    let through), and after ``TASKS_PER_WORKER`` tasks, so nothing a bad file
+    left behind carries over.
+
+    Yields ``(key, result, failure, seconds)`` as tasks finish: the value
+    ``func`` returned and None, or None and a ``(kind, message)`` pair when
+    ``func`` raised or the worker had to be killed or died, and the seconds
+    the task ran. Arguments and results must pickle.
+    """
+    import multiprocessing
+    from multiprocessing.connection import wait
+
+    context = multiprocessing.get_context('fork')
+    pending = list(tasks)
+    pending.reverse()
+    workers = []
+
+    try:
+        while pending or any(worker.key is not None for worker in workers):
+            for worker in workers:
+                if worker.key is None and pending:
+                    worker.assign(*pending.pop())
+            while pending and len(workers) < jobs:
+                worker = Worker(context, timeout, max_rss_mb)
+                workers.append(worker)
+                worker.assign(*pending.pop())
+
+            busy = [worker for worker in workers if worker.key is not None]
+            wait([worker.conn for worker in busy] + [worker.process.sentinel for worker in busy], RSS_POLL_INTERVAL)
+            now = time.monotonic()
+            for worker in busy:
+                result = None
+                failure = None
+                if worker.conn.poll():
+                    try:
+                        result, failure = worker.conn.recv()
+                    except EOFError:
+                        failure = _exit_failure(worker.process)
+                elif not worker.process.is_alive():
+                    failure = _exit_failure(worker.process)
+                elif worker.deadline is not None and now > worker.deadline:
+                    failure = ('timeout', f"killed after {timeout + KILL_GRACE}s without finishing")
+                elif max_rss_mb and (_rss_mb(worker.process.pid) or 0) > max_rss_mb:
+                    failure = ('memory', f"killed at over {max_rss_mb} MB resident memory")
+                else:
+                    continue
+                key, seconds = worker.finish()
+                if failure is not None or worker.tasks >= TASKS_PER_WORKER:
+                    worker.stop()
+                    workers.remove(worker)
+                yield key, result, failure, seconds
+    finally:
+        for worker in workers:
+            worker.stop()
+
+def _exit_failure(process):
+    process.join()
+    code = process.exitcode
+    if code is not None and code < 0:
+        try:
+            name = signal.Signals(-code).name
+        except ValueError:
+            name = str(-code)
+        # The kernel's OOM killer uses SIGKILL
+        kind = 'memory' if -code == signal.SIGKILL else 'crashed'
+        return kind, f"worker killed by {name}"
+    return 'crashed', f"worker exited with code {code} without a result"
+
+def quarantine(path, quarantine_dir, record):
+    """Move a failed input to quarantine_dir, next to a <name>.reason.json record of why.
+
+    Returns the new path of the file. Raises FileExistsError, leaving the
+    file where it is, if a file of that name or its record is already in
+    quarantine.
+    """
+    os.makedirs(quarantine_dir, exist_ok=True)
+    target = os.path.join(quarantine_dir, os.path.basename(path))
+    for existing in (target, target + REASON_SUFFIX):
+        if os.path.exists(existing):
+            raise FileExistsError(f"{existing} already exists")
+    shutil.move(path, target)
+    record = dict(record, file=os.path.basename(path), original_path=path,
+                  quarantined=datetime.now().isoformat(timespec='seconds'))
+    with open(target + REASON_SUFFIX, 'w') as f:
+        json.dump(record, f, indent=2)
+    return target
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""Micro-benchmark: single-pass LineClassifier vs. the original per-line pattern loop.
+
+Both are run over the same lines, either taken from a statement (PDF or plain
+text file) or synthesized, and the throughput in lines/sec is reported for the
+normal and thorough pattern sets.
+"""
+import os
+import re
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_to_csv import (FOREX_PATTERN, RATE_PATTERN, THOROUGH_PATTERNS, TRANSACTION_PATTERNS,
+                        get_line_classifier, read_page_texts)
+
+def synthetic_lines(count, seed=0):
+    """Generate a mix of transaction, forex, rate and noise lines like a TD statement."""
+    rng = random.Random(seed)
+    months = ['JAN', 'FEB', 'MAR', 'NOV', 'DEC']
+    noise = ["TRANSACTION POSTING ACTIVITY DESCRIPTION AMOUNT($)", "Page 2 of 4",
+             "Minimum Payment $10.00", "", "TD CASH BACK VISA INFINITE* CARD",
+             "Annual Interest Rate 19.99%"]
+    lines = []
+    while len(lines) < count:
+        month = rng.choice(months)
+        day = rng.randint(1, 28)
+        amount = f"${rng.randint(1, 99999) / 100:,.2f}"
+        roll = rng.random()
+        if roll < 0.6:
+            layout = rng.choice(["{m}{d}{m}{e} {a} MERCHANT #{i}", "{m}{d} {m}{e} {a} STORE {i}",
+                                 "{m} {d}{m} {e} {a} SHOP {i}"])
+            lines.append(layout.format(m=month, d=day, e=day + 1, a=amount, i=len(lines)))
+        elif roll < 0.7:
+            lines.append(f"FOREIGN CURRENCY {rng.randint(1, 999)}.{rng.randint(10, 99)} USD")
+            lines.append(f"@EXCHANGE RATE 1.{rng.randint(100000, 999999)}")
+        else:
+            lines.append(rng.choice(noise))
+    return lines[:count]
+
+def legacy_classify(lines, patterns):
+    """The original loop: every pattern in turn, then the forex and rate regexes."""
+    transaction_patterns = [re.compile(pattern, re.MULTILINE) for pattern in patterns]
+    results = []
+    for line in lines:
+        if not line.strip():
+            continue
+        main_match = None
+        for pattern in transaction_patterns:
+            match = pattern.match(line.strip())
+            if match:
+                main_match = match
+                break
+        forex_match = re.match(FOREX_PATTERN, line.strip())
+        rate_match = re.match(RATE_PATTERN, line.strip())
+        results.append(main_match or forex_match or rate_match)
+    return results
+
+def classifier_classify(lines, classifier):
+    classify = classifier.classify
+    return [classify(line) for line in lines]
+
+def best_rate(func, lines, repeat):
+    """Return the best lines/sec over several runs."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return len(lines) / best
+
+def load_lines(path):
+    if path.lower().endswith('.pdf'):
+        return '\n'.join(read_page_texts(path)).split('\n')
+    with open(path) as f:
+        return f.read().split('\n')
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the line classifier against the original pattern loop')
+    parser.add_argument('source', nargs='?', help='Statement PDF or text file to take lines from (default: synthetic)')
+    parser.add_argument('--lines', type=int, default=50000, help='Number of synthetic lines (default: 50000)')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement; the best is kept (default: 5)')
+    args = parser.parse_args()
+
+    lines = load_lines(args.source) if args.source else synthetic_lines(args.lines)
+    print(f"Benchmarking on {len(lines)} lines")
+
+    for thorough in (False, True):
+        patterns = TRANSACTION_PATTERNS + (THOROUGH_PATTERNS if thorough else [])
+        classifier = get_line_classifier(thorough)
+
+        # Both must agree on which lines are interesting before their speed is compared
+        legacy = [match is not None for match in legacy_classify(lines, patterns)]
+        single = [result is not None for line, result in zip(lines, classifier_classify(lines, classifier))
+                  if line.strip()]
+        if legacy != single:
+            print("Error: classifier and legacy loop disagree on the same lines")
+            return 1
+
+        legacy_rate = best_rate(lambda: legacy_classify(lines, patterns), lines, args.repeat)
+        single_rate = best_rate(lambda: classifier_classify(lines, classifier), lines, args.repeat)
+        mode = "thorough" if thorough else "normal"
+        print(f"{mode:>8}: legacy loop {legacy_rate:,.0f} lines/sec, "
+              f"classifier {single_rate:,.0f} lines/sec ({single_rate / legacy_rate:.2f}x)")
+
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
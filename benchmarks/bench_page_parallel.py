@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Benchmark page-parallel extraction of one long statement, and check it matches the sequential path.
+
+Builds a long synthetic statement where every page ends with a foreign
+currency purchase whose FOREIGN CURRENCY and EXCHANGE RATE lines are pushed
+to the top of the next page, so each page boundary has to be stitched.
+Extracts it sequentially and with each --jobs value, reports the time of
+each run, and exits with status 1 if any parallel result differs from the
+sequential one in any field (section included).
+"""
+import io
+import os
+import sys
+import time
+import argparse
+import tempfile
+import contextlib
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+
+from generate_statements import build_statement, write_pdf
+
+def boundary_statement(pages, per_page, seed=0):
+    """Build statement pages whose continuation lines straddle every page break."""
+    statement, _ = build_statement(pages=pages, per_page=per_page, forex_share=0.1, seed=seed)
+    for page_num in range(len(statement) - 1):
+        lines = statement[page_num]
+        # A foreign purchase at the end of the page, with its details carried to the next page
+        lines.append("JAN 5JAN 7 $130.00 HOTEL ABROAD")
+        statement[page_num + 1][1:1] = ["FOREIGN CURRENCY 95.59 USD", "@EXCHANGE RATE 1.360000"]
+    return statement
+
+def timed_extract(pdf_path, thorough, page_jobs):
+    from pdf_to_csv import extract_transactions
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        transactions = extract_transactions(pdf_path, thorough=thorough, page_jobs=page_jobs)
+        return transactions, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark and check page-parallel extraction')
+    parser.add_argument('pdf', nargs='?', help='Statement to use (default: generate a long synthetic one)')
+    parser.add_argument('--pages', type=int, default=300, help='Pages of the synthetic statement (default: 300)')
+    parser.add_argument('--per-page', type=int, default=40, help='Transactions per page (default: 40)')
+    parser.add_argument('--jobs', default='2,4', help='Comma-separated page_jobs values to try (default: 2,4)')
+    parser.add_argument('--thorough', '-t', action='store_true', help='Compare thorough mode as well')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = args.pdf
+        if not pdf_path:
+            pdf_path = os.path.join(tmp_dir, "long.pdf")
+            write_pdf(pdf_path, boundary_statement(args.pages, args.per_page))
+
+        failed = False
+        for thorough in ([False, True] if args.thorough else [False]):
+            mode = "thorough" if thorough else "normal"
+            expected, sequential = timed_extract(pdf_path, thorough, None)
+            print(f"{mode:>8} sequential: {sequential:.3f}s, {len(expected)} transactions")
+            for jobs in (int(value) for value in args.jobs.split(',')):
+                transactions, seconds = timed_extract(pdf_path, thorough, jobs)
+                same = transactions == expected
+                failed = failed or not same
+                print(f"{mode:>8} page_jobs={jobs}: {seconds:.3f}s ({sequential / seconds:.2f}x)"
+                      f"{'' if same else '  MISMATCH with sequential output'}")
+
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    exit(main())
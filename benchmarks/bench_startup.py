@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Benchmark cold-start time of the command line tools.
+
+Times `cli.py --help` and `cli.py convert` on a one-page synthetic statement,
+each in a fresh interpreter, and exits with status 1 if the median of either
+exceeds its threshold. Meant to be run in CI or before a release so heavy
+imports creeping back into module load get noticed.
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from generate_statements import build_statement, write_pdf
+
+CLI = os.path.join(REPO_DIR, "cli.py")
+
+def time_command(cmd, runs):
+    """Run a command ``runs`` times and return the median wall time in milliseconds."""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        completed = subprocess.run(cmd, cwd=REPO_DIR, capture_output=True, text=True)
+        timings.append((time.perf_counter() - start) * 1000)
+        if completed.returncode != 0:
+            raise RuntimeError(f"{' '.join(cmd)} failed:\n{completed.stderr}")
+    return statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark cold-start time of cli.py')
+    parser.add_argument('--runs', type=int, default=7, help='Runs per command (default: 7)')
+    parser.add_argument('--max-help-ms', type=float, default=150,
+                        help='Fail if the median `cli.py --help` time exceeds this (default: 150)')
+    parser.add_argument('--max-convert-ms', type=float, default=600,
+                        help='Fail if the median one-page convert time exceeds this (default: 600)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = os.path.join(tmp_dir, "statement.pdf")
+        pages, _ = build_statement(pages=1, per_page=20)
+        write_pdf(pdf_path, pages)
+
+        checks = [
+            ('python (baseline)', [sys.executable, '-c', 'pass'], None),
+            ('cli.py --help', [sys.executable, CLI, '--help'], args.max_help_ms),
+            ('cli.py convert', [sys.executable, CLI, 'convert', pdf_path,
+                                '--output', os.path.join(tmp_dir, "statement.csv")], args.max_convert_ms),
+        ]
+        failed = False
+        for name, cmd, threshold in checks:
+            median = time_command(cmd, args.runs)
+            status = ''
+            if threshold is not None:
+                status = 'ok' if median <= threshold else f'FAIL (limit {threshold:.0f} ms)'
+                failed = failed or median > threshold
+            print(f"{name:<18} {median:>8.1f} ms  {status}")
+
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""Generate synthetic TD-style credit card statement PDFs for benchmarking.
+
+The PDFs are written directly (no PDF library needed) with one text line per
+statement line, so PyPDF2 extracts text in the same shape as a real TD
+statement: STATEMENT DATE / STATEMENT PERIOD headers on page 1, section
+headers, transaction lines in any of the three date layouts the parser
+handles, FOREIGN CURRENCY / EXCHANGE RATE continuation lines, and optional
+boilerplate pages without transactions.
+"""
+import os
+import zlib
+import random
+import argparse
+from datetime import date, timedelta
+
+MONTH_ABBRS = ['JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC']
+MONTH_NAMES = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August',
+               'September', 'October', 'November', 'December']
+
+# The three transaction date layouts recognised by the parser
+LAYOUTS = {
+    'compact': "{td}{pd} {amount} {description}",      # JAN15JAN17 $12.34 MERCHANT
+    'spaced': "{td} {pd} {amount} {description}",      # JAN15 JAN17 $12.34 MERCHANT
+    'split': "{td_sp}{pd_sp} {amount} {description}",  # JAN 15JAN 17 $12.34 MERCHANT
+}
+
+MERCHANTS = ["COFFEE SHOP TORONTO ON", "GROCERY MART #1042", "AMAZON.CA", "NETFLIX.COM",
+             "SHELL C02391 OTTAWA", "UBER *TRIP", "HOTEL DU VIEUX QUEBEC", "PHARMACY 0231",
+             "RESTAURANT LE PETIT", "APPLE.COM/BILL", "HARDWARE DEPOT 7003", "PARKING LOT 12"]
+FOREX_CURRENCIES = [("USD", 1.36), ("EUR", 1.47), ("GBP", 1.71), ("JPY", 0.0092)]
+
+BOILERPLATE = [
+    "INTEREST RATE AND FEE DISCLOSURE",
+    "Annual Interest Rate for purchases 19.99%, cash advances 22.99%.",
+    "If you pay your New Balance in full by the Payment Due Date you will not pay interest",
+    "on new purchases. Interest is charged from the transaction date on cash advances.",
+    "Minimum payment: the greater of $10 or 3% of the New Balance, plus any overlimit amount.",
+    "Foreign currency transactions are converted at a rate 2.5% above the benchmark rate.",
+]
+
+def _escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+def write_pdf(path, pages, compress=True):
+    """Write a minimal PDF with one Helvetica text line per entry of each page's line list."""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        ops = ["BT", "/F1 8 Tf", "10 TL", "36 770 Td"]
+        ops.extend(f"({_escape(line)}) Tj T*" for line in lines)
+        ops.append("ET")
+        content = "\n".join(ops).encode('latin-1')
+        if compress:
+            content = zlib.compress(content)
+            header = b"<< /Length %d /Filter /FlateDecode >>" % len(content)
+        else:
+            header = b"<< /Length %d >>" % len(content)
+        objects.append(header + b"\nstream\n" + content + b"\nendstream")
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects))
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid in kids), len(kids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+
+    with open(path, 'wb') as f:
+        f.write(out)
+
+def _short_date(day, spaced=False):
+    return f"{MONTH_ABBRS[day.month - 1]}{' ' if spaced else ''}{day.day}"
+
+def _long_date(day):
+    return f"{MONTH_NAMES[day.month - 1]} {day.day}, {day.year}"
+
+def _money(cents):
+    sign = '-' if cents < 0 else ''
+    return f"{sign}${abs(cents) / 100:,.2f}"
+
+def build_statement(pages=3, per_page=30, forex_share=0.1, multi_year=False, layout='mixed',
+                    boilerplate_pages=0, seed=0):
+    """Build the text lines of a synthetic statement.
+
+    Returns ``(pages, transaction_count)`` where pages is a list of line lists.
+    """
+    rng = random.Random(seed)
+    if multi_year:
+        end = date(2024, 1, rng.randint(5, 20))
+    else:
+        end = date(2024, rng.randint(3, 11), rng.randint(5, 20))
+    start = end - timedelta(days=30)
+
+    previous_balance = rng.randint(0, 500000)
+    total = 0
+    count = 0
+    layouts = list(LAYOUTS) if layout == 'mixed' else [layout]
+
+    statement_pages = []
+    for page_num in range(pages):
+        lines = []
+        if page_num == 0:
+            lines.extend([
+                "TD CASH BACK VISA INFINITE* CARD",
+                f"STATEMENT DATE: {_long_date(end)}",
+                f"STATEMENT PERIOD: {_long_date(start)} to {_long_date(end)}",
+                f"PREVIOUS STATEMENT BALANCE {_money(previous_balance)}",
+                "TRANSACTION POSTING ACTIVITY DESCRIPTION AMOUNT($)",
+            ])
+        else:
+            lines.append(f"Page {page_num + 1} of {pages + boilerplate_pages}")
+
+        for idx in range(per_page):
+            if idx == per_page // 2 and rng.random() < 0.5:
+                lines.append("PAYMENTS AND CREDITS")
+            transaction_day = start + timedelta(days=rng.randint(0, 30))
+            posting_day = min(transaction_day + timedelta(days=rng.randint(0, 3)), end)
+            if rng.random() < 0.05:
+                cents = -rng.randint(1000, 200000)
+                description = "PAYMENT - THANK YOU"
+            else:
+                cents = rng.randint(100, 250000)
+                description = rng.choice(MERCHANTS)
+            style = LAYOUTS[rng.choice(layouts)]
+            lines.append(style.format(
+                td=_short_date(transaction_day), pd=_short_date(posting_day),
+                td_sp=_short_date(transaction_day, True), pd_sp=_short_date(posting_day, True),
+                amount=_money(cents), description=description))
+            if cents > 0 and rng.random() < forex_share:
+                currency, rate = rng.choice(FOREX_CURRENCIES)
+                lines.append(f"FOREIGN CURRENCY {cents / 100 / rate:,.2f} {currency}")
+                lines.append(f"@EXCHANGE RATE {rate:.6f}")
+            total += cents
+            count += 1
+
+        if page_num == pages - 1:
+            lines.append(f"NEW BALANCE {_money(previous_balance + total)}")
+        statement_pages.append(lines)
+
+    for _ in range(boilerplate_pages):
+        statement_pages.append(list(BOILERPLATE) * 4)
+
+    return statement_pages, count
+
+def generate_corpus(output_dir, count=10, pages=3, per_page=30, forex_share=0.1, multi_year_share=0.2,
+                    layout='mixed', boilerplate_pages=0, seed=0):
+    """Write ``count`` statements to output_dir and return a list of (path, transaction_count)."""
+    os.makedirs(output_dir, exist_ok=True)
+    rng = random.Random(seed)
+    corpus = []
+    for idx in range(count):
+        statement, transaction_count = build_statement(
+            pages=pages, per_page=per_page, forex_share=forex_share,
+            multi_year=rng.random() < multi_year_share, layout=layout,
+            boilerplate_pages=boilerplate_pages, seed=rng.randrange(2 ** 32))
+        path = os.path.join(output_dir, f"{idx + 1:04d}.pdf")
+        write_pdf(path, statement)
+        corpus.append((path, transaction_count))
+    return corpus
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic TD-style statement PDFs')
+    parser.add_argument('output_dir', help='Directory to write the PDFs to')
+    parser.add_argument('--count', '-n', type=int, default=10, help='Number of statements (default: 10)')
+    parser.add_argument('--pages', type=int, default=3, help='Transaction pages per statement (default: 3)')
+    parser.add_argument('--per-page', type=int, default=30, help='Transactions per page (default: 30)')
+    parser.add_argument('--forex-share', type=float, default=0.1,
+                        help='Share of purchases made in a foreign currency (default: 0.1)')
+    parser.add_argument('--multi-year-share', type=float, default=0.2,
+                        help='Share of statements whose period spans December/January (default: 0.2)')
+    parser.add_argument('--layout', choices=sorted(LAYOUTS) + ['mixed'], default='mixed',
+                        help='Transaction date layout (default: mixed)')
+    parser.add_argument('--boilerplate-pages', type=int, default=0,
+                        help='Disclosure pages without transactions appended to each statement (default: 0)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    args = parser.parse_args()
+
+    corpus = generate_corpus(args.output_dir, count=args.count, pages=args.pages, per_page=args.per_page,
+                             forex_share=args.forex_share, multi_year_share=args.multi_year_share,
+                             layout=args.layout, boilerplate_pages=args.boilerplate_pages, seed=args.seed)
+    total = sum(transaction_count for _, transaction_count in corpus)
+    print(f"Wrote {len(corpus)} statements with {total} transactions to {args.output_dir}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""Benchmark statement parsing throughput and memory.
+
+Runs extract_transactions over a corpus of statements in normal, thorough
+and adaptive mode, and process_all_pdfs over the whole corpus, each in a fresh
+interpreter so peak RSS is measured per scenario. Reports pages/sec,
+transactions/sec and peak RSS, and stores the results as JSON so runs can be
+compared with --compare. Without --corpus, a synthetic corpus is generated
+with generate_statements.py.
+"""
+import io
+import os
+import sys
+import glob
+import json
+import time
+import platform
+import argparse
+import resource
+import tempfile
+import subprocess
+import contextlib
+from datetime import datetime
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from generate_statements import generate_corpus
+
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, "results")
+
+# Metrics compared by --compare, and whether higher is better
+METRICS = {
+    'pages_per_sec': True,
+    'transactions_per_sec': True,
+    'files_per_sec': True,
+    'seconds': False,
+    'peak_rss_mb': False,
+}
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def measure(scenario, corpus_dir, jobs=None):
+    """Run one scenario in this process and return its measurements."""
+    from PyPDF2 import PdfReader
+    from pdf_to_csv import ADAPTIVE, extract_transactions
+    from process_all_pdfs import process_all_pdfs
+
+    pdf_files = sorted(glob.glob(os.path.join(corpus_dir, "*.pdf")))
+    pages = sum(len(PdfReader(pdf_file).pages) for pdf_file in pdf_files)
+    transactions = 0
+
+    # The converter reports progress on stdout; keep it out of the measurement output
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        if scenario == 'batch':
+            with tempfile.TemporaryDirectory() as output_dir:
+                results = process_all_pdfs(input_dir=corpus_dir, output_dir=output_dir, jobs=jobs)
+            transactions = sum(result['rows'] for result in results)
+        else:
+            for pdf_file in pdf_files:
+                thorough = {'thorough': True, 'adaptive': ADAPTIVE}.get(scenario, False)
+                transactions += len(extract_transactions(pdf_file, thorough=thorough))
+        seconds = time.perf_counter() - start
+
+    return {
+        'files': len(pdf_files),
+        'pages': pages,
+        'transactions': transactions,
+        'seconds': seconds,
+        'files_per_sec': len(pdf_files) / seconds,
+        'pages_per_sec': pages / seconds,
+        'transactions_per_sec': transactions / seconds,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+def run_scenario(scenario, corpus_dir, jobs=None):
+    """Run a scenario in a fresh interpreter so its peak RSS is its own."""
+    cmd = [sys.executable, os.path.abspath(__file__), '--measure', scenario, '--corpus', corpus_dir]
+    if jobs:
+        cmd.extend(['--jobs', str(jobs)])
+    completed = subprocess.run(cmd, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Scenario '{scenario}' failed:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def environment():
+    """Describe where the benchmark ran, so results are only compared like for like."""
+    import PyPDF2
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'python': platform.python_version(),
+        'pypdf2': PyPDF2.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'commit': commit,
+    }
+
+def compare(results, baseline):
+    """Print the change of every metric against a previous results file."""
+    print(f"\nCompared with {baseline.get('timestamp')} (commit {baseline['environment'].get('commit')}):")
+    for scenario, measurements in results['results'].items():
+        previous = baseline['results'].get(scenario)
+        if not previous:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            if metric not in measurements or not previous.get(metric):
+                continue
+            change = (measurements[metric] - previous[metric]) / previous[metric] * 100
+            better = (change > 0) == higher_is_better
+            print(f"  {scenario:>8} {metric:<21} {previous[metric]:>12.2f} -> {measurements[metric]:>12.2f} "
+                  f"({change:+.1f}%{'' if abs(change) < 1 else ', better' if better else ', worse'})")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark statement parsing throughput and memory')
+    parser.add_argument('--corpus', help='Directory of statement PDFs (default: generate a synthetic corpus)')
+    parser.add_argument('--count', type=int, default=20, help='Synthetic statements to generate (default: 20)')
+    parser.add_argument('--pages', type=int, default=4, help='Pages per synthetic statement (default: 4)')
+    parser.add_argument('--per-page', type=int, default=40, help='Transactions per page (default: 40)')
+    parser.add_argument('--forex-share', type=float, default=0.1, help='Share of foreign currency purchases')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the synthetic corpus (default: 0)')
+    parser.add_argument('--jobs', '-j', type=int, default=None, help='Workers for the batch scenario')
+    parser.add_argument('--scenarios', default='normal,thorough,adaptive,batch',
+                        help='Comma-separated scenarios to run (default: normal,thorough,adaptive,batch)')
+    parser.add_argument('--output', '-o', help='Results JSON path (default: benchmarks/results/<timestamp>.json)')
+    parser.add_argument('--compare', help='Previous results JSON to compare against')
+    parser.add_argument('--measure', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        # Child process: run one scenario and report it as JSON on the last line
+        print(json.dumps(measure(args.measure, args.corpus, args.jobs)))
+        return 0
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        corpus_dir = args.corpus
+        corpus = {'path': corpus_dir}
+        if not corpus_dir:
+            corpus_dir = os.path.join(tmp_dir, "corpus")
+            generate_corpus(corpus_dir, count=args.count, pages=args.pages, per_page=args.per_page,
+                            forex_share=args.forex_share, seed=args.seed)
+            corpus = {'synthetic': True, 'count': args.count, 'pages': args.pages,
+                      'per_page': args.per_page, 'forex_share': args.forex_share, 'seed': args.seed}
+
+        results = {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'environment': environment(),
+            'corpus': corpus,
+            'results': {}
+        }
+        for scenario in args.scenarios.split(','):
+            measurements = run_scenario(scenario, corpus_dir, args.jobs)
+            results['results'][scenario] = measurements
+            print(f"{scenario:>8}: {measurements['pages_per_sec']:,.1f} pages/sec, "
+                  f"{measurements['transactions_per_sec']:,.0f} transactions/sec, "
+                  f"{measurements['files_per_sec']:,.2f} files/sec, "
+                  f"peak RSS {measurements['peak_rss_mb']:.1f} MB")
+
+    output = args.output or os.path.join(RESULTS_DIR, datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
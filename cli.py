@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""Single entry point for the statement tools.
+
+Only the subcommand's own module is imported, so `cli.py --help` and light
+subcommands start without loading PyPDF2 or the batch machinery.
+"""
+import sys
+import importlib
+
+# Subcommand -> (module, description)
+COMMANDS = {
+    'convert': ('pdf_to_csv', 'Convert one statement PDF to CSV'),
+    'batch': ('process_all_pdfs', 'Convert every PDF in a directory'),
+    'combine': ('combine_csv_files', 'Combine per-statement CSV files into one ledger'),
+    'dump': ('debug_pdf', 'Print the extracted text of each page of a PDF'),
+    'serve': ('service', 'Serve conversions over HTTP from warm worker processes'),
+    'backends': ('extract_backends', 'Benchmark the PDF text extraction backends and pick one'),
+}
+
+def usage():
+    lines = ["usage: cli.py <command> [options]", "", "commands:"]
+    lines.extend(f"  {name:<10} {description}" for name, (_, description) in COMMANDS.items())
+    lines.append("")
+    lines.append("Run 'cli.py <command> --help' for the options of a command.")
+    return "\n".join(lines)
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ('-h', '--help'):
+        print(usage())
+        return 0
+
+    command, rest = argv[0], argv[1:]
+    if command not in COMMANDS:
+        print(f"cli.py: unknown command '{command}'\n\n{usage()}", file=sys.stderr)
+        return 2
+
+    module = importlib.import_module(COMMANDS[command][0])
+    result = module.main(rest, prog=f"cli.py {command}")
+    return result if isinstance(result, int) else 0
+
+if __name__ == "__main__":
+    exit(main())
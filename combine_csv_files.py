@@ -1,69 +1,285 @@
 #!/usr/bin/env python3
 import os
-import pandas as pd
-import glob
 import re
+import csv
+import glob
+import heapq
+import argparse
+import tempfile
+
+from dedupe_index import DEFAULT_WINDOW_DAYS, SOURCE_FIELD, DedupeIndex
+
+# Rows sorted in memory at a time when an input has to be externally sorted
+DEFAULT_CHUNK_SIZE = 100000
+# Most runs merged at once, to stay well under the open file limit
+MAX_OPEN_RUNS = 256
+# Suffix of the duplicate report written next to the combined CSV
+REPORT_SUFFIX = '.duplicates.csv'
+
+def report_path(output_file):
+    """Path of the duplicate report for a combined CSV: combined.csv -> combined.duplicates.csv."""
+    return os.path.splitext(output_file)[0] + REPORT_SUFFIX
+
+def csv_file_order(path):
+    """Sort key for input files: numerically by trailing number (01.csv, 02.csv, ...), then by name."""
+    match = re.search(r'(\d+)\.csv$', path)
+    return (int(match.group(1)) if match else float('inf'), os.path.basename(path))
+
+def scan_csv(path):
+    """Read a CSV once to get its columns, its row count and whether it is sorted by transaction_date."""
+    with open(path, newline='') as f:
+        reader = csv.DictReader(f)
+        fieldnames = reader.fieldnames or []
+        rows = 0
+        is_sorted = True
+        previous = None
+        for row in reader:
+            date = row.get('transaction_date') or ''
+            if previous is not None and date < previous:
+                is_sorted = False
+            previous = date
+            rows += 1
+    return fieldnames, rows, is_sorted
+
+def read_run(path):
+    """Yield (transaction_date, row) from a CSV that is already sorted by date.
+
+    Rows are tagged with the name of the file they came from, unless a
+    temporary run already recorded it.
+    """
+    source = os.path.basename(path)
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            if not row.get(SOURCE_FIELD):
+                row[SOURCE_FIELD] = source
+            yield row.get('transaction_date') or '', row
+
+def sort_into_runs(path, fieldnames, tmp_dir, chunk_size):
+    """External sort: split an unsorted CSV into sorted temporary CSV runs of at most chunk_size rows."""
+    runs = []
+    source = os.path.basename(path)
+
+    def flush(chunk):
+        chunk.sort(key=lambda row: row.get('transaction_date') or '')
+        fd, run_path = tempfile.mkstemp(suffix='.csv', dir=tmp_dir)
+        with os.fdopen(fd, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames + [SOURCE_FIELD], restval='')
+            writer.writeheader()
+            writer.writerows(chunk)
+        runs.append(run_path)
+
+    with open(path, newline='') as f:
+        chunk = []
+        for row in csv.DictReader(f):
+            row[SOURCE_FIELD] = row.get(SOURCE_FIELD) or source
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                flush(chunk)
+                chunk = []
+        if chunk:
+            flush(chunk)
+    return runs
+
+def merge_runs(runs):
+    """Merge sorted runs into one stream of rows, keeping input order for equal dates."""
+    def keyed(run_idx, path):
+        for seq, (date, row) in enumerate(read_run(path)):
+            yield date, run_idx, seq, row
+
+    for _, _, _, row in heapq.merge(*(keyed(run_idx, path) for run_idx, path in enumerate(runs))):
+        yield row
+
+def reduce_runs(runs, fieldnames, tmp_dir, max_open=MAX_OPEN_RUNS):
+    """Merge groups of runs into temporary runs until few enough remain to merge at once."""
+    while len(runs) > max_open:
+        merged = []
+        for start in range(0, len(runs), max_open):
+            fd, run_path = tempfile.mkstemp(suffix='.csv', dir=tmp_dir)
+            with os.fdopen(fd, 'w', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=fieldnames + [SOURCE_FIELD], restval='')
+                writer.writeheader()
+                writer.writerows(merge_runs(runs[start:start + max_open]))
+            merged.append(run_path)
+        runs = merged
+    return runs
+
+def write_merged(runs, fieldnames, output_file, dedupe=None):
+    """Merge sorted runs into output_file and return the number of rows written.
+
+    The rows go to a temporary file that is moved into place, so a failed run
+    never leaves a partial ledger. Rows pass through ``dedupe`` (a
+    DedupeIndex) on the way, if given.
+    """
+    fd, tmp_output = tempfile.mkstemp(suffix='.csv', dir=os.path.dirname(os.path.abspath(output_file)))
+    total_rows = 0
+    rows = merge_runs(runs)
+    if dedupe is not None:
+        rows = dedupe.filter(rows)
+    try:
+        with os.fdopen(fd, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames, restval='', extrasaction='ignore')
+            writer.writeheader()
+            for row in rows:
+                writer.writerow(row)
+                total_rows += 1
+        os.replace(tmp_output, output_file)
+    except BaseException:
+        os.unlink(tmp_output)
+        raise
+    return total_rows
+
+def combine_csv_files(input_dir='out', output_file=None, chunk_size=DEFAULT_CHUNK_SIZE, dedupe=None,
+                      window_days=DEFAULT_WINDOW_DAYS):
+    """Merge the per-statement CSV files in input_dir into one CSV sorted by transaction_date.
+
+    Each input is normally already sorted by date, so the files are combined
+    with a streaming k-way merge that holds one row per file in memory. Inputs
+    that turn out not to be sorted are first split into sorted runs of
+    ``chunk_size`` rows (an external sort). ``output_file`` defaults to
+    combined.csv in input_dir. Returns the number of rows written.
+
+    With ``dedupe`` set to 'flag' or 'drop', the merged rows go through a
+    DedupeIndex in the same pass: transactions repeated by overlapping
+    statements are flagged (or dropped), possible wrong-year duplicates are
+    flagged, and so are statements whose dates overlap. Findings go to
+    <output>.duplicates.csv.
+    """
+    if output_file is None:
+        output_file = os.path.join(input_dir, 'combined.csv')
+
+    # Get all CSV files in the input directory
+    csv_files = glob.glob(os.path.join(input_dir, '*.csv'))
+
+    # Filter out the combined output file if it exists
+    output_abspath = os.path.abspath(output_file)
+    csv_files = [f for f in csv_files
+                 if os.path.basename(f) != 'combined.csv' and os.path.abspath(f) != output_abspath
+                 and not f.endswith(REPORT_SUFFIX)]
 
-def combine_csv_files():
-    # Path to the output directory
-    out_dir = 'out'
-    # Output file path
-    output_file = 'out/combined.csv'
-    
-    # Get all CSV files in the out directory
-    csv_files = glob.glob(os.path.join(out_dir, '*.csv'))
-    
     if not csv_files:
-        print("No CSV files found in the 'out' directory.")
-        return
-    
-    # Filter out the combined.csv file if it exists
-    csv_files = [f for f in csv_files if os.path.basename(f) != 'combined.csv']
-    
+        print(f"No CSV files found in the '{input_dir}' directory.")
+        return 0
+
     # Sort files numerically by filename (01.csv, 02.csv, etc.)
-    csv_files.sort(key=lambda f: int(re.search(r'(\d+)\.csv$', f).group(1)))
-    
+    csv_files.sort(key=csv_file_order)
+
     print(f"Found {len(csv_files)} CSV files to process in order: {[os.path.basename(f) for f in csv_files]}")
-    
-    # List to store DataFrames
-    dfs = []
-    
-    # Read each CSV file and append to the list
+
+    fieldnames = []
+    sorted_files = []
+    unsorted_files = []
     for csv_file in csv_files:
         try:
-            df = pd.read_csv(csv_file)
-            file_name = os.path.basename(csv_file)
-            print(f"Reading: {file_name} - {len(df)} rows")
-            # Add a column to track the source file
-            df['source_file'] = file_name
-            dfs.append(df)
-        except Exception as e:
+            file_fieldnames, rows, is_sorted = scan_csv(csv_file)
+        except (OSError, csv.Error, UnicodeDecodeError) as e:
             print(f"Error reading {csv_file}: {str(e)}")
-    
-    if not dfs:
+            continue
+        print(f"Reading: {os.path.basename(csv_file)} - {rows} rows{'' if is_sorted else ' (not sorted)'}")
+        if not file_fieldnames:
+            continue
+        for name in file_fieldnames:
+            if name not in fieldnames:
+                fieldnames.append(name)
+        (sorted_files if is_sorted else unsorted_files).append(csv_file)
+
+    if not fieldnames:
         print("No valid CSV files to combine.")
-        return
-    
-    # Combine all DataFrames
-    combined_df = pd.concat(dfs, ignore_index=True)
-    
-    # Convert transaction_date to datetime for proper sorting
-    combined_df['transaction_date'] = pd.to_datetime(combined_df['transaction_date'])
-    
-    # Sort by transaction_date
-    combined_df = combined_df.sort_values('transaction_date')
-    
-    # Convert back to string format
-    combined_df['transaction_date'] = combined_df['transaction_date'].dt.strftime('%Y-%m-%d')
-    
-    # Remove the source_file column before saving
-    combined_df = combined_df.drop('source_file', axis=1)
-    
-    # Write to output file
-    combined_df.to_csv(output_file, index=False)
-    
+        return 0
+
+    output_dir = os.path.dirname(output_abspath)
+    os.makedirs(output_dir, exist_ok=True)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Sorted inputs are merged as they are; unsorted ones go through an external sort first
+        runs = list(sorted_files)
+        for csv_file in unsorted_files:
+            runs.extend(sort_into_runs(csv_file, fieldnames, tmp_dir, chunk_size))
+        runs = reduce_runs(runs, fieldnames, tmp_dir)
+
+        if dedupe:
+            with open(report_path(output_file), 'w', newline='') as report_file:
+                index = DedupeIndex(report_file, drop=dedupe == 'drop', window_days=window_days)
+                total_rows = write_merged(runs, fieldnames, output_file, index)
+                overlaps = index.report_overlaps()
+            print_dedupe_summary(index, overlaps, report_path(output_file))
+        else:
+            total_rows = write_merged(runs, fieldnames, output_file)
+
     print(f"Combined CSV created successfully: {output_file}")
-    print(f"Total rows: {len(combined_df)}")
+    print(f"Total rows: {total_rows}")
+    return total_rows
+
+def print_dedupe_summary(index, overlaps, report):
+    """Report what the duplicate check found."""
+    action = "dropped" if index.drop else "flagged"
+    if overlaps is not None:
+        print(f"Overlapping statements: {overlaps} pair(s)")
+    print(f"Duplicates from overlapping statements: {index.duplicates} ({action})")
+    print(f"Possible wrong-year duplicates: {index.year_apart} (flagged)")
+    print(f"Duplicate report: {report}")
+
+def merge_into_combined(csv_files, combined_file, chunk_size=DEFAULT_CHUNK_SIZE, dedupe=None,
+                        window_days=DEFAULT_WINDOW_DAYS):
+    """Merge new per-statement CSV files into an existing combined CSV.
+
+    Only the combined file and the new files are read, so adding a statement
+    costs one pass over the ledger instead of re-reading every statement.
+    Rows with equal dates keep the ledger's order, followed by the new rows.
+    Falls back to a full combine_csv_files of the new files' directory if the
+    combined file doesn't exist yet. Returns the number of rows written.
+    ``dedupe`` checks the new rows against the ledger as in
+    combine_csv_files; findings are appended to the duplicate report.
+    """
+    if not os.path.exists(combined_file):
+        return combine_csv_files(os.path.dirname(csv_files[0]) or '.', combined_file, chunk_size, dedupe,
+                                 window_days)
+
+    # The ledger is sorted by construction; only its header is needed up front
+    with open(combined_file, newline='') as f:
+        fieldnames = next(csv.reader(f), [])
+    sorted_files = []
+    unsorted_files = []
+    for csv_file in csv_files:
+        file_fieldnames, rows, is_sorted = scan_csv(csv_file)
+        print(f"Adding: {os.path.basename(csv_file)} - {rows} rows")
+        for name in file_fieldnames:
+            if name not in fieldnames:
+                fieldnames.append(name)
+        (sorted_files if is_sorted else unsorted_files).append(csv_file)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        runs = [combined_file] + sorted_files
+        for csv_file in unsorted_files:
+            runs.extend(sort_into_runs(csv_file, fieldnames, tmp_dir, chunk_size))
+        runs = reduce_runs(runs, fieldnames, tmp_dir)
+        if dedupe:
+            report = report_path(combined_file)
+            new_report = not os.path.exists(report)
+            with open(report, 'a', newline='') as report_file:
+                index = DedupeIndex(report_file, drop=dedupe == 'drop', window_days=window_days,
+                                    write_header=new_report)
+                total_rows = write_merged(runs, fieldnames, combined_file, index)
+            print_dedupe_summary(index, None, report)
+        else:
+            total_rows = write_merged(runs, fieldnames, combined_file)
+
+    print(f"Combined CSV updated: {combined_file} ({total_rows} rows)")
+    return total_rows
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Combine per-statement CSV files into one CSV sorted by date')
+    parser.add_argument('input_dir', nargs='?', default='out', help='Directory of CSV files (default: out)')
+    parser.add_argument('--output', '-o', help='Combined CSV path (default: <input_dir>/combined.csv)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f'Rows sorted in memory at once for unsorted inputs (default: {DEFAULT_CHUNK_SIZE})')
+    parser.add_argument('--dedupe', choices=['off', 'flag', 'drop'], default='flag',
+                        help='Flag (default) or drop transactions repeated by overlapping statements; '
+                             'findings go to <output>.duplicates.csv')
+    parser.add_argument('--window-days', type=int, default=DEFAULT_WINDOW_DAYS,
+                        help=f'Days a transaction is kept in the duplicate index (default: {DEFAULT_WINDOW_DAYS})')
+    args = parser.parse_args(argv)
+
+    combine_csv_files(args.input_dir, args.output, args.chunk_size,
+                      None if args.dedupe == 'off' else args.dedupe, args.window_days)
 
 if __name__ == "__main__":
-    combine_csv_files() 
\ No newline at end of file
+    main()
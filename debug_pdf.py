@@ -1,24 +1,58 @@
 #!/usr/bin/env python3
-from PyPDF2 import PdfReader
-import sys
+import os
+import argparse
+from pdf_to_csv import read_page_texts
+from pdf_source import source_name, source_sha256
+from page_cache import add_cache_arguments, cache_from_args, extractor_id
+from extract_backends import add_backend_arguments
+from page_dump import dump_path, write_dump
 
-def extract_and_print_pdf_content(pdf_path):
-    """Extract and print the content of a PDF file for debugging."""
-    reader = PdfReader(pdf_path)
+def extract_and_print_pdf_content(pdf_path, cache=None, file=None, backend=None):
+    """Extract and print the content of a PDF file for debugging.
+
+    ``pdf_path`` may also be a bytes-like object or a binary file object.
+    Output goes to ``file`` (default: stdout). ``backend`` names the text
+    extraction backend.
+    """
+    page_texts = read_page_texts(pdf_path, cache, backend)
+    
+    print(f"PDF has {len(page_texts)} pages", file=file)
     
-    print(f"PDF has {len(reader.pages)} pages")
+    for page_num, text in enumerate(page_texts):
+        print(f"\n\n===== PAGE {page_num+1} =====\n", file=file)
+        print(text, file=file)
+
+def dump_pdf_content(pdf_path, output_path, cache=None, backend=None):
+    """Write the extracted text of every page of a PDF to a page text dump (see page_dump).
+
+    The dump can be parsed again with ``pdf_to_csv.py --from-dump`` without
+    PyPDF2. The header names the extraction backend and its version.
+    Returns the number of pages written.
+    """
+    page_texts = read_page_texts(pdf_path, cache, backend)
+    write_dump(output_path, page_texts, source=os.path.basename(source_name(pdf_path)),
+               sha256=source_sha256(pdf_path), extractor=extractor_id(backend))
+    return len(page_texts)
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog,
+                                     description='Print the extracted text of each page of a PDF')
+    parser.add_argument('pdf_path', nargs='+', help='Path to the PDF file(s)')
+    parser.add_argument('--dump', metavar='DIR',
+                        help='Write a compressed page text dump per PDF to DIR '
+                             '(<name>.pages.jsonl.gz) instead of printing')
+    add_backend_arguments(parser)
+    add_cache_arguments(parser)
+    args = parser.parse_args(argv)
     
-    for page_num in range(len(reader.pages)):
-        page = reader.pages[page_num]
-        text = page.extract_text()
-        
-        print(f"\n\n===== PAGE {page_num+1} =====\n")
-        print(text)
+    cache = cache_from_args(args)
+    for pdf_path in args.pdf_path:
+        if args.dump:
+            output_path = dump_path(pdf_path, args.dump)
+            page_count = dump_pdf_content(pdf_path, output_path, cache=cache, backend=args.backend)
+            print(f"{pdf_path}: {page_count} pages dumped to {output_path}")
+        else:
+            extract_and_print_pdf_content(pdf_path, cache=cache, backend=args.backend)
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python debug_pdf.py <pdf_file>")
-        sys.exit(1)
-        
-    pdf_path = sys.argv[1]
-    extract_and_print_pdf_content(pdf_path) 
\ No newline at end of file
+    main()
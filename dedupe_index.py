@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+import re
+import csv
+from collections import deque
+from datetime import date
+from functools import lru_cache
+
+from transaction import parse_cents
+
+# Row key holding the name of the statement CSV a row came from while combining
+SOURCE_FIELD = '_source'
+
+# Days an entry stays in the index after its transaction date; the same transaction taken
+# from two overlapping statements normally has identical dates, so it is seen almost at once
+DEFAULT_WINDOW_DAYS = 7
+
+# Months whose transactions can be given the wrong year when a statement period spans
+# December and January (see Limitations in the README); only these are kept for a year
+YEAR_BOUNDARY_MONTHS = (1, 12)
+
+REPORT_FIELDNAMES = ['kind', 'action', 'source', 'other_source', 'transaction_date', 'posting_date',
+                     'description', 'amount', 'detail']
+
+_FOREIGN_SUFFIX = re.compile(r'\([\d,.]+ [A-Z]{3}\)')
+_NON_ALNUM = re.compile(r'[^A-Z0-9]+')
+
+@lru_cache(maxsize=4096)
+def normalize_description(description):
+    """Description reduced to upper-case words, without the foreign currency suffix or punctuation."""
+    description = _FOREIGN_SUFFIX.sub('', description.upper())
+    return _NON_ALNUM.sub(' ', description).strip()
+
+@lru_cache(maxsize=4096)
+def _parse_date(date_str):
+    try:
+        return date.fromisoformat(date_str)
+    except (TypeError, ValueError):
+        return None
+
+def _year_before(day):
+    try:
+        return day.replace(year=day.year - 1)
+    except ValueError:  # 29 February
+        return None
+
+class DedupeIndex:
+    """Streaming duplicate check for the combined ledger.
+
+    Rows must arrive sorted by transaction date, as combine_csv_files merges
+    them. Each row is keyed on (posting date, amount in cents, normalized
+    description):
+
+    - a row whose key was already seen more times in another statement than in
+      its own is an exact duplicate from an overlapping statement; it is
+      flagged, or dropped with ``drop``
+    - a row whose key, one year earlier, was seen in another statement is
+      flagged as a possible wrong-year duplicate (never dropped)
+
+    Entries expire ``window_days`` after their posting date, except those
+    in December and January, which are kept for a year to catch wrong-year
+    duplicates, so the index holds a bounded window of the ledger rather than
+    all of it. Findings are written to ``report_file`` (a CSV writer target)
+    as they are found. The first and last posting date of every statement
+    are kept as well, to report overlapping statements. Posting dates are
+    used because a statement holds what posted in its period: a purchase made
+    before the period closed but posted after it belongs to the next
+    statement, so transaction dates of neighbouring statements always
+    overlap by a few days.
+    """
+
+    def __init__(self, report_file, drop=False, window_days=DEFAULT_WINDOW_DAYS, write_header=True):
+        self.drop = drop
+        self.window_days = window_days
+        self._report = csv.DictWriter(report_file, fieldnames=REPORT_FIELDNAMES)
+        if write_header:
+            self._report.writeheader()
+        self._counts = {}         # key -> {source: rows seen}
+        self._recent = deque()    # (expiry ordinal, key, source) in arrival order
+        self._year = deque()      # the same, for entries kept for a year
+        self._sources = {}        # source -> [first posting date, last posting date]
+        self.duplicates = 0
+        self.year_apart = 0
+
+    def __len__(self):
+        return len(self._recent) + len(self._year)
+
+    def filter(self, rows):
+        """Yield the rows to keep, checking each one against the index."""
+        for row in rows:
+            if self.check(row):
+                yield row
+
+    def check(self, row):
+        """Index one row and report it if it duplicates another; returns False if it should be dropped."""
+        source = row.get(SOURCE_FIELD) or ''
+        transaction_date = row.get('transaction_date') or ''
+        posting_date = row.get('posting_date') or transaction_date
+        if posting_date:
+            # Rows arrive in transaction date order, so either end of the span can move
+            span = self._sources.setdefault(source, [posting_date, posting_date])
+            span[0] = min(span[0], posting_date)
+            span[1] = max(span[1], posting_date)
+
+        posting_day = _parse_date(posting_date)
+        try:
+            cents = parse_cents(row.get('amount') or '')
+        except ValueError:
+            return True
+        if posting_day is None:
+            return True
+        today = _parse_date(transaction_date) or posting_day
+        self._expire(today.toordinal())
+
+        description = normalize_description(row.get('description') or '')
+        key = (posting_date, cents, description)
+        counts = self._counts.setdefault(key, {})
+        seen_here = counts.get(source, 0)
+        other = next((other for other, count in counts.items() if other != source and count > seen_here), None)
+        counts[source] = seen_here + 1
+        expiry = posting_day.toordinal() + self.window_days
+        if posting_day.month in YEAR_BOUNDARY_MONTHS:
+            self._year.append((expiry + 366, key, source))
+        else:
+            self._recent.append((expiry, key, source))
+
+        keep = True
+        if other is not None:
+            self.duplicates += 1
+            keep = not self.drop
+            self._write('duplicate', 'dropped' if self.drop else 'flagged', row, source, other,
+                        f"also in {other}")
+
+        year_before = _year_before(posting_day)
+        if year_before is not None and posting_day.month in YEAR_BOUNDARY_MONTHS:
+            earlier = self._counts.get((year_before.isoformat(), cents, description), {})
+            other = next((other for other in earlier if other != source), None)
+            if other is not None:
+                self.year_apart += 1
+                self._write('year_apart', 'flagged', row, source, other,
+                            f"same transaction on {year_before.isoformat()} in {other}")
+        return keep
+
+    def _expire(self, today):
+        for entries in (self._recent, self._year):
+            while entries and entries[0][0] < today:
+                _, key, source = entries.popleft()
+                counts = self._counts.get(key)
+                if counts is None:
+                    continue
+                counts[source] -= 1
+                if counts[source] <= 0:
+                    del counts[source]
+                if not counts:
+                    del self._counts[key]
+
+    def _write(self, kind, action, row, source, other, detail):
+        self._report.writerow({
+            'kind': kind, 'action': action, 'source': source, 'other_source': other,
+            'transaction_date': row.get('transaction_date'), 'posting_date': row.get('posting_date'),
+            'description': row.get('description'), 'amount': row.get('amount'), 'detail': detail
+        })
+
+    def overlaps(self):
+        """Return ``(source, other_source, first_date, last_date)`` for statements whose posting dates overlap."""
+        spans = sorted((first, last, source) for source, (first, last) in self._sources.items())
+        found = []
+        for idx, (first, last, source) in enumerate(spans):
+            for other_first, other_last, other in spans[idx + 1:]:
+                if other_first > last:
+                    break
+                found.append((source, other, other_first, min(last, other_last)))
+        return found
+
+    def report_overlaps(self):
+        """Write the overlapping statements to the report and return how many pairs overlap."""
+        found = self.overlaps()
+        for source, other, first, last in found:
+            self._report.writerow({'kind': 'overlap', 'action': 'flagged', 'source': source,
+                                   'other_source': other, 'transaction_date': first, 'posting_date': last,
+                                   'detail': f"both cover {first} to {last}"})
+        return len(found)
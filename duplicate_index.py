@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+from transaction import to_cents
+
+class DuplicateIndex:
+    """Hash index of (date, amount in cents) for spotting already-captured transactions.
+
+    Lookups are O(1): an exact match checks one key and a near match checks
+    the amount one cent either side as well, so float rounding in parsed
+    amounts never hides a duplicate.
+    """
+
+    def __init__(self, tolerance_cents=1):
+        self.tolerance_cents = tolerance_cents
+        self._counts = {}
+        self.suppressed = 0
+
+    def __len__(self):
+        return sum(self._counts.values())
+
+    def add(self, date, amount):
+        """Record a transaction's date and amount."""
+        key = (date, to_cents(amount))
+        self._counts[key] = self._counts.get(key, 0) + 1
+
+    def contains(self, date, amount):
+        """Return True if a transaction on this date within the cent tolerance is indexed."""
+        cents = to_cents(amount)
+        for delta in range(-self.tolerance_cents, self.tolerance_cents + 1):
+            if (date, cents + delta) in self._counts:
+                return True
+        return False
+
+    def add_if_new(self, date, amount):
+        """Index a candidate unless it duplicates one already indexed.
+
+        Returns True if the candidate was new; duplicates are counted in
+        ``suppressed``.
+        """
+        if self.contains(date, amount):
+            self.suppressed += 1
+            return False
+        self.add(date, amount)
+        return True
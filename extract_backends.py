@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""PDF text extraction backends, and a calibration command to choose between them.
+
+PyPDF2 is the default. pypdfium2, pdfminer.six and poppler's pdftotext are
+used when installed and asked for with --backend, or once calibration has
+shown that they give the same transactions as PyPDF2 on sample statements.
+"""
+import io
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+
+from page_filter import may_hold_transactions
+
+DEFAULT_BACKEND = 'pypdf2'
+# Where calibration saves the chosen backend
+DEFAULT_CONFIG_PATH = os.path.join(".cache", "extract_backend.json")
+DEFAULT_SAMPLE_SIZE = 10
+
+class PyPDF2Document:
+    """A PDF opened with PyPDF2; the only backend that can prefilter pages without extracting them."""
+
+    def __init__(self, stream):
+        from PyPDF2 import PdfReader
+
+        self.reader = PdfReader(stream)
+        self.page_count = len(self.reader.pages)
+
+    def page_text(self, page_num):
+        return self.reader.pages[page_num].extract_text()
+
+    def may_hold_transactions(self, page_num):
+        return may_hold_transactions(self.reader.pages[page_num])
+
+    def close(self):
+        pass
+
+class PdfiumDocument:
+    """A PDF opened with pypdfium2. Other backends keep every page when prefiltering."""
+
+    def __init__(self, stream):
+        import pypdfium2
+
+        self.pdf = pypdfium2.PdfDocument(stream.read())
+        self.page_count = len(self.pdf)
+
+    def page_text(self, page_num):
+        page = self.pdf[page_num]
+        textpage = page.get_textpage()
+        try:
+            return textpage.get_text_range().replace('\r\n', '\n')
+        finally:
+            textpage.close()
+            page.close()
+
+    def may_hold_transactions(self, page_num):
+        return True
+
+    def close(self):
+        self.pdf.close()
+
+class PdfminerDocument:
+    def __init__(self, stream):
+        from pdfminer.pdfpage import PDFPage
+
+        self.pages = list(PDFPage.get_pages(stream))
+        self.page_count = len(self.pages)
+
+    def page_text(self, page_num):
+        from pdfminer.converter import TextConverter
+        from pdfminer.layout import LAParams
+        from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+
+        output = io.StringIO()
+        manager = PDFResourceManager()
+        with TextConverter(manager, output, laparams=LAParams()) as converter:
+            PDFPageInterpreter(manager, converter).process_page(self.pages[page_num])
+        return output.getvalue().rstrip('\f')
+
+    def may_hold_transactions(self, page_num):
+        return True
+
+    def close(self):
+        pass
+
+class PdftotextDocument:
+    """Runs poppler's pdftotext once over the whole document; pages are split at form feeds."""
+
+    def __init__(self, stream):
+        with tempfile.NamedTemporaryFile(suffix='.pdf') as f:
+            shutil.copyfileobj(stream, f)
+            f.flush()
+            completed = subprocess.run(['pdftotext', '-enc', 'UTF-8', f.name, '-'],
+                                       capture_output=True, check=True)
+        self.pages = completed.stdout.decode('utf-8').split('\f')
+        if self.pages and not self.pages[-1]:
+            self.pages.pop()
+        self.page_count = len(self.pages)
+
+    def page_text(self, page_num):
+        return self.pages[page_num]
+
+    def may_hold_transactions(self, page_num):
+        return True
+
+    def close(self):
+        pass
+
+def _module_version(module_name):
+    import importlib
+    module = importlib.import_module(module_name)
+    return getattr(module, '__version__', None) or getattr(module, 'V_PYPDFIUM2', 'unknown')
+
+def _pdftotext_version():
+    completed = subprocess.run(['pdftotext', '-v'], capture_output=True, text=True)
+    # pdftotext prints its version on stderr: "pdftotext version 22.02.0"
+    first_line = (completed.stderr or completed.stdout).splitlines()[0]
+    return first_line.split()[-1]
+
+class Backend:
+    """A text extraction engine: how to open a document with it and how to tell its version."""
+
+    def __init__(self, name, document_class, module=None, binary=None):
+        self.name = name
+        # Cache keys and dump headers keep PyPDF2's original "PyPDF2-<version>" form
+        self.label = module or binary
+        self.document_class = document_class
+        self.module = module
+        self.binary = binary
+        self._version = None
+
+    def available(self):
+        if self.binary:
+            return shutil.which(self.binary) is not None
+        import importlib.util
+        return importlib.util.find_spec(self.module) is not None
+
+    def version(self):
+        if self._version is None:
+            self._version = _pdftotext_version() if self.binary else _module_version(self.module)
+        return self._version
+
+    def extractor_id(self):
+        """Identify the engine and its version, e.g. for the page text cache key."""
+        return f"{self.label}-{self.version()}"
+
+    def preload(self):
+        """Import the backend's library now, e.g. in a worker process initializer."""
+        if self.module:
+            import importlib
+            importlib.import_module(self.module)
+
+    def open(self, stream):
+        """Open a PDF from a seekable binary stream."""
+        return self.document_class(stream)
+
+BACKENDS = {
+    'pypdf2': Backend('pypdf2', PyPDF2Document, module='PyPDF2'),
+    'pypdfium2': Backend('pypdfium2', PdfiumDocument, module='pypdfium2'),
+    'pdfminer': Backend('pdfminer', PdfminerDocument, module='pdfminer'),
+    'pdftotext': Backend('pdftotext', PdftotextDocument, binary='pdftotext'),
+}
+
+_configured = {}
+
+def configured_backend(config_path=DEFAULT_CONFIG_PATH):
+    """Name of the backend saved by calibration, if it is still installed, else the default."""
+    if config_path not in _configured:
+        name = DEFAULT_BACKEND
+        try:
+            with open(config_path) as f:
+                saved = json.load(f).get('backend')
+            if saved in BACKENDS and BACKENDS[saved].available():
+                name = saved
+        except (OSError, ValueError, AttributeError):
+            pass
+        _configured[config_path] = name
+    return _configured[config_path]
+
+def get_backend(name=None):
+    """Return a backend by name; None or 'auto' means the calibrated choice (default: PyPDF2)."""
+    if name in (None, 'auto'):
+        name = configured_backend()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown extraction backend '{name}' (known: {', '.join(BACKENDS)})")
+    backend = BACKENDS[name]
+    if not backend.available():
+        raise ValueError(f"Extraction backend '{name}' is not installed")
+    return backend
+
+def available_backends():
+    """Names of the backends installed here, the default first."""
+    return [name for name, backend in BACKENDS.items() if backend.available()]
+
+def add_backend_arguments(parser):
+    """Add the --backend option to an argparse parser."""
+    parser.add_argument('--backend', choices=['auto'] + list(BACKENDS), default='auto',
+                        help='PDF text extraction backend (default: auto, the calibrated choice or pypdf2)')
+
+def sample_files(paths, sample_size):
+    """PDF files named or found in the given directories, spread evenly down to sample_size."""
+    pdf_files = []
+    for path in paths:
+        if os.path.isdir(path):
+            pdf_files.extend(sorted(os.path.join(path, name) for name in os.listdir(path)
+                                    if name.lower().endswith('.pdf')))
+        elif os.path.exists(path):
+            pdf_files.append(path)
+        else:
+            print(f"Warning: {path} does not exist, skipping.")
+    if sample_size and len(pdf_files) > sample_size:
+        step = len(pdf_files) / sample_size
+        pdf_files = [pdf_files[int(idx * step)] for idx in range(sample_size)]
+    return pdf_files
+
+def calibrate(pdf_files, backends=None, thorough=False):
+    """Time each backend over pdf_files and check its transactions against the default backend's.
+
+    Returns a dict per backend with the total ``seconds``, whether it is
+    ``safe`` (identical transactions for every file) and the files that
+    ``differ``. Backends that fail on a file are reported with its error.
+    """
+    from pdf_to_csv import extract_transactions
+
+    backends = backends or available_backends()
+    if DEFAULT_BACKEND in backends:
+        backends = [DEFAULT_BACKEND] + [name for name in backends if name != DEFAULT_BACKEND]
+    expected = {}
+    results = {}
+    for name in backends:
+        result = {'seconds': 0.0, 'safe': True, 'differ': [], 'error': None}
+        for pdf_file in pdf_files:
+            start = time.perf_counter()
+            try:
+                transactions = extract_transactions(pdf_file, thorough=thorough, quiet=True, backend=name)
+            except Exception as e:
+                result.update(safe=False, error=f"{os.path.basename(pdf_file)}: {type(e).__name__}: {e}")
+                break
+            result['seconds'] += time.perf_counter() - start
+            if name == DEFAULT_BACKEND:
+                expected[pdf_file] = transactions
+            elif transactions != expected.get(pdf_file):
+                result['safe'] = False
+                result['differ'].append(os.path.basename(pdf_file))
+        results[name] = result
+    return results
+
+def save_choice(name, results, pdf_files, config_path=DEFAULT_CONFIG_PATH):
+    """Save the chosen backend and the calibration that chose it."""
+    directory = os.path.dirname(config_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    config = {
+        'backend': name,
+        'version': BACKENDS[name].version(),
+        'calibrated': datetime.now().isoformat(timespec='seconds'),
+        'files': len(pdf_files),
+        'results': results,
+    }
+    with open(config_path + ".tmp", 'w') as f:
+        json.dump(config, f, indent=2)
+    os.replace(config_path + ".tmp", config_path)
+    _configured.pop(config_path, None)
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Benchmark the installed PDF text extraction backends '
+                                                            'on sample statements and pick the fastest safe one')
+    parser.add_argument('paths', nargs='*', default=['in'], help='Statement PDFs or directories (default: in)')
+    parser.add_argument('--sample', type=int, default=DEFAULT_SAMPLE_SIZE,
+                        help=f'Most statements to use (default: {DEFAULT_SAMPLE_SIZE}, 0 for all)')
+    parser.add_argument('--thorough', '-t', action='store_true', help='Compare thorough-mode transactions')
+    parser.add_argument('--save', action='store_true', help=f'Save the fastest safe backend to {DEFAULT_CONFIG_PATH}')
+    args = parser.parse_args(argv)
+
+    installed = available_backends()
+    print(f"Installed backends: {', '.join(installed)}")
+    pdf_files = sample_files(args.paths, args.sample)
+    if not pdf_files:
+        print("No PDF files to calibrate with.")
+        return 1
+
+    print(f"Calibrating on {len(pdf_files)} statements...")
+    results = calibrate(pdf_files, installed, args.thorough)
+    for name, result in results.items():
+        if result['error']:
+            status = f"failed ({result['error']})"
+        elif not result['safe']:
+            status = f"transactions differ in {', '.join(result['differ'])}"
+        else:
+            status = "same transactions"
+        print(f"  {name:<10} {result['seconds']:8.3f}s  {status}")
+
+    safe = [name for name, result in results.items() if result['safe']]
+    if not safe:
+        print(f"No backend could be checked against {DEFAULT_BACKEND}.")
+        return 1
+    choice = min(safe, key=lambda name: results[name]['seconds'])
+    print(f"Fastest safe backend: {choice}")
+    if args.save:
+        save_choice(choice, results, pdf_files)
+        print(f"Saved to {DEFAULT_CONFIG_PATH}")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
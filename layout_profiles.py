@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+import re
+from collections import OrderedDict
+
+from line_classifier import LineClassifier
+from section_segmenter import SectionSegmenter
+
+# Non-empty lines at the top of page 1 that make up a template's fingerprint
+TEMPLATE_LINES = 6
+# Template fingerprints whose detected profile is remembered
+DETECTION_CACHE_SIZE = 256
+
+class LayoutProfile:
+    """Everything needed to parse one issuer's statement template.
+
+    ``markers`` are regexes looked for on page 1 to recognise the template;
+    the profile with the most matching markers wins. Transaction patterns
+    follow the LineClassifier group conventions. ``date_patterns`` and
+    ``period_patterns`` are tried in order and must capture (month, day,
+    year) and (start month, day, year, end month, day, year).
+    ``section_headers`` maps each section header to its section type.
+    ``balance_patterns`` optionally capture the previous and new balance
+    amounts printed on the statement, for checking the transactions found.
+    Regexes are compiled once, when the profile is created.
+    """
+
+    def __init__(self, name, issuer, markers, transaction_patterns, forex_pattern, rate_pattern,
+                 date_patterns, period_patterns, section_headers, thorough_patterns=(),
+                 balance_patterns=(None, None)):
+        self.name = name
+        self.issuer = issuer
+        self.transaction_patterns = list(transaction_patterns)
+        self.thorough_patterns = list(thorough_patterns)
+        self.forex_pattern = forex_pattern
+        self.rate_pattern = rate_pattern
+        self.section_headers = dict(section_headers)
+        self.segmenter = SectionSegmenter(self.section_headers)
+        self._markers = [re.compile(marker) for marker in markers]
+        self._date_regexes = [re.compile(pattern) for pattern in date_patterns]
+        self._period_regexes = [re.compile(pattern) for pattern in period_patterns]
+        self.balance_regexes = tuple(re.compile(pattern) if pattern else None for pattern in balance_patterns)
+        self._classifiers = {}
+
+    def __repr__(self):
+        return f"LayoutProfile({self.name!r})"
+
+    def classifier(self, thorough=False):
+        """Return the profile's line classifier, adding the looser patterns in thorough mode."""
+        if thorough not in self._classifiers:
+            patterns = self.transaction_patterns + (self.thorough_patterns if thorough else [])
+            self._classifiers[thorough] = LineClassifier(patterns, self.forex_pattern, self.rate_pattern)
+        return self._classifiers[thorough]
+
+    def match_statement_date(self, text):
+        """Search text for the statement date, trying the most structured format first."""
+        for regex in self._date_regexes:
+            match = regex.search(text)
+            if match:
+                return match
+        return None
+
+    def match_statement_period(self, text):
+        """Search text for the statement period in any of the profile's formats."""
+        for regex in self._period_regexes:
+            match = regex.search(text)
+            if match:
+                return match
+        return None
+
+    def score(self, text):
+        """Number of the profile's markers found in text."""
+        return sum(1 for marker in self._markers if marker.search(text))
+
+PROFILES = {}
+DEFAULT_PROFILE = 'td'
+_detected = OrderedDict()
+
+def register_profile(profile):
+    """Add a layout profile to the registry, replacing any profile of the same name."""
+    PROFILES[profile.name] = profile
+    _detected.clear()
+    return profile
+
+def get_profile(name=None):
+    """Return a registered profile by name (default: the TD profile)."""
+    if isinstance(name, LayoutProfile):
+        return name
+    name = name or DEFAULT_PROFILE
+    if name not in PROFILES:
+        raise ValueError(f"Unknown layout '{name}' (known: {', '.join(sorted(PROFILES))})")
+    return PROFILES[name]
+
+def template_key(page_text):
+    """Cheap fingerprint of a statement template: the first lines of page 1 without their digits.
+
+    Dates, amounts and account numbers differ between statements of the same
+    template; the words in the header do not.
+    """
+    lines = []
+    for line in page_text.split('\n'):
+        line = re.sub(r'\d+', '', line).strip()
+        if line:
+            lines.append(line)
+            if len(lines) == TEMPLATE_LINES:
+                break
+    return '\n'.join(lines)
+
+def detect_profile(page_text):
+    """Pick the profile for a statement from the text of its first page.
+
+    The profile with the most markers on the page wins, falling back to the
+    default profile if none match. Results are cached by template_key, so
+    further statements of a known template skip the marker search.
+    """
+    key = template_key(page_text)
+    name = _detected.get(key)
+    if name is not None:
+        _detected.move_to_end(key)
+        return PROFILES[name]
+
+    best, best_score = get_profile(), 0
+    for profile in PROFILES.values():
+        score = profile.score(page_text)
+        if score > best_score:
+            best, best_score = profile, score
+
+    _detected[key] = best.name
+    if len(_detected) > DETECTION_CACHE_SIZE:
+        _detected.popitem(last=False)
+    return best
+
+def resolve_profile(layout, page_text):
+    """Return the profile for a layout name, profile object, or None/'auto' to detect it from page 1."""
+    if isinstance(layout, LayoutProfile):
+        return layout
+    if layout in (None, 'auto'):
+        return detect_profile(page_text)
+    return get_profile(layout)
+
+TD = register_profile(LayoutProfile(
+    name='td',
+    issuer='TD Canada Trust',
+    markers=[r'STATEMENT DATE:', r'STATEMENT PERIOD:', r'\bTD\b'],
+    transaction_patterns=[
+        # Standard format: JAN15JAN17 $12.34 MERCHANT NAME
+        r'([A-Z]{3}\s*\d{1,2})([A-Z]{3}\s*\d{1,2})\s+(-?\$[\d,]+\.\d{2})\s+(.*)',
+
+        # Alternate format with space between dates: JAN15 JAN17 $12.34 MERCHANT
+        r'([A-Z]{3}\s*\d{1,2})\s+([A-Z]{3}\s*\d{1,2})\s+(-?\$[\d,]+\.\d{2})\s+(.*)',
+
+        # Format with different date style: JAN 15JAN 17 $12.34 MERCHANT
+        r'([A-Z]{3}\s+\d{1,2})([A-Z]{3}\s+\d{1,2})\s+(-?\$[\d,]+\.\d{2})\s+(.*)'
+    ],
+    thorough_patterns=[
+        # Even more flexible pattern with possible text between dates and amount
+        r'([A-Z]{3}\s*\d{1,2}).*?([A-Z]{3}\s*\d{1,2}).*?(-?\$[\d,]+\.\d{2})\s+(.*)',
+
+        # Pattern with just one date and amount
+        r'([A-Z]{3}\s*\d{1,2}).*?(-?\$[\d,]+\.\d{2})\s+(.*)'
+    ],
+    # Foreign currency line: FOREIGN CURRENCY 15.00 USD
+    forex_pattern=r'FOREIGN CURRENCY\s+([\d,.]+)\s*([A-Z]{3})',
+    # Exchange rate line: @EXCHANGE RATE 1.333333
+    rate_pattern=r'@\s*EXCHANGE\s*RATE\s*([\d,.]+)',
+    date_patterns=[
+        r'STATEMENT DATE:\s*(\w+)\s+(\d{1,2}),\s*(\d{4})',
+        # No space between month and day but with comma
+        r'STATEMENT DATE:\s*(\w+?)(\d{1,2}),\s*(\d{4})',
+        # No spaces and no comma
+        r'STATEMENT DATE:(\w+?)(\d{1,2})(\d{4})'
+    ],
+    period_patterns=[
+        r'STATEMENT PERIOD:\s*(\w+)\s+(\d{1,2}),\s*(\d{4})\s*to\s*(\w+)\s+(\d{1,2}),\s*(\d{4})',
+        # No spaces between month and day
+        r'STATEMENT PERIOD:\s*(\w+?)(\d{1,2}),?(\d{4})\s*to\s*(\w+?)(\d{1,2}),?(\d{4})',
+        # No spaces at all
+        r'STATEMENT PERIOD:\s*(\w+?)(\d{1,2})(\d{4})to(\w+?)(\d{1,2})(\d{4})'
+    ],
+    # Common section headers in TD statements and the type of section each one starts
+    section_headers={
+        "TRANSACTIONS": "transactions",
+        "PURCHASES AND ADJUSTMENTS": "purchase",
+        "PAYMENTS AND CREDITS": "payment",
+        "YOUR TRANSACTIONS": "transactions",
+        "PREVIOUS STATEMENT BALANCE": "balance",
+        "YOUR ACCOUNT TRANSACTIONS": "transactions"
+    },
+    balance_patterns=(r'PREVIOUS STATEMENT BALANCE\s*(-?\$[\d,]+\.\d{2})', r'NEW BALANCE\s*(-?\$[\d,]+\.\d{2})')
+))
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+import re
+
+# Line kinds returned by LineClassifier.classify
+TRANSACTION = 'transaction'
+FOREX = 'forex'
+RATE = 'rate'
+
+class LineClassifier:
+    """Classify statement lines in a single regex pass.
+
+    All transaction patterns plus the foreign currency and exchange rate
+    patterns are combined into one alternation, tried in order, so a line is
+    matched once instead of once per pattern. Transaction patterns must capture
+    either (date, posting date, amount, description) or (date, amount,
+    description); the forex pattern captures (amount, currency) and the rate
+    pattern captures (rate).
+    """
+
+    def __init__(self, transaction_patterns, forex_pattern, rate_pattern):
+        alternatives = []
+        # Map the index of each alternative's last group to (kind, pattern index, first group)
+        self._alternatives = {}
+        group = 1
+        for pattern_idx, pattern in enumerate(transaction_patterns):
+            group_count = re.compile(pattern).groups
+            if group_count not in (3, 4):
+                raise ValueError(f"Transaction pattern must have 3 or 4 groups: {pattern}")
+            alternatives.append(pattern)
+            self._alternatives[group + group_count - 1] = (TRANSACTION, pattern_idx, group, group_count)
+            group += group_count
+        for kind, pattern in ((FOREX, forex_pattern), (RATE, rate_pattern)):
+            group_count = re.compile(pattern).groups
+            alternatives.append(pattern)
+            self._alternatives[group + group_count - 1] = (kind, None, group, group_count)
+            group += group_count
+
+        self.pattern_count = len(transaction_patterns)
+        self._regex = re.compile('|'.join(f'(?:{pattern})' for pattern in alternatives))
+
+    def classify(self, line):
+        """Classify one line of statement text.
+
+        Returns None for noise, otherwise a tuple whose first item is the kind:
+
+        - ``(TRANSACTION, pattern_idx, date, posting_date, amount, description)``
+          with spaces removed from the date tokens (``posting_date`` is None for
+          single-date patterns), ``$`` and ``,`` removed from the amount and the
+          description stripped
+        - ``(FOREX, foreign_amount, currency)`` with ``,`` removed from the amount
+        - ``(RATE, exchange_rate)`` with ``,`` removed
+        """
+        line = line.strip()
+        if not line:
+            return None
+        match = self._regex.match(line)
+        if not match:
+            return None
+
+        kind, pattern_idx, first, group_count = self._alternatives[match.lastindex]
+        groups = match.groups()[first - 1:first - 1 + group_count]
+        if kind == TRANSACTION:
+            if group_count == 4:
+                date, posting_date, amount, description = groups
+                posting_date = posting_date.replace(' ', '')
+            else:
+                date, amount, description = groups
+                posting_date = None
+            return (TRANSACTION, pattern_idx, date.replace(' ', ''), posting_date,
+                    amount.replace('$', '').replace(',', ''), description.strip())
+        if kind == FOREX:
+            return (FOREX, groups[0].replace(',', ''), groups[1])
+        return (RATE, groups[0].replace(',', ''))
+
+    def classify_page(self, text):
+        """Classify every line of a page of text.
+
+        Returns ``(line_end, line, classified)`` for each line that is not
+        noise, where ``line_end`` is the offset just past the line in text.
+        """
+        records = []
+        line_start = 0
+        for line in text.split('\n'):
+            line_end = line_start + len(line)
+            line_start = line_end + 1
+            classified = self.classify(line)
+            if classified is not None:
+                records.append((line_end, line, classified))
+        return records
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+import os
+import json
+
+from page_cache import file_sha256
+
+MANIFEST_NAME = ".manifest.json"
+MANIFEST_VERSION = 1
+
+def manifest_path(output_dir):
+    """Return the path of the processed-files manifest for an output directory."""
+    return os.path.join(output_dir, MANIFEST_NAME)
+
+def load_manifest(path):
+    """Load a manifest, returning an empty one if it is missing or unreadable."""
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return {'version': MANIFEST_VERSION, 'files': {}}
+    except (OSError, ValueError) as e:
+        print(f"Warning: Could not read manifest {path}: {e}. Starting a new one.")
+        return {'version': MANIFEST_VERSION, 'files': {}}
+
+    if manifest.get('version') != MANIFEST_VERSION:
+        print(f"Warning: Manifest {path} has an unsupported version. Starting a new one.")
+        return {'version': MANIFEST_VERSION, 'files': {}}
+    return manifest
+
+def save_manifest(manifest, path):
+    """Write the manifest atomically so an interrupted run never corrupts it."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def plan_incremental(pdf_files, manifest, parser_version, options):
+    """Decide which inputs need converting.
+
+    An input is skipped when its manifest entry has the same size and mtime (or,
+    if those changed, the same content hash), the same parser version and
+    options, and its output still exists. Returns ``(to_convert, unchanged,
+    stale)`` where ``to_convert`` maps each input path to its fingerprint and
+    ``stale`` lists entries whose input has been deleted.
+    """
+    entries = manifest['files']
+    to_convert = {}
+    unchanged = []
+
+    for pdf_file in pdf_files:
+        key = os.path.basename(pdf_file)
+        stat = os.stat(pdf_file)
+        fingerprint = {'size': stat.st_size, 'mtime': stat.st_mtime, 'sha256': None}
+        entry = entries.get(key)
+
+        current = (entry is not None
+                   and entry.get('parser_version') == parser_version
+                   and entry.get('options') == options
+                   and entry.get('output')
+                   and os.path.exists(entry['output']))
+        if current and (entry['size'], entry['mtime']) != (stat.st_size, stat.st_mtime):
+            # Touched or copied - only the content hash can tell whether it changed
+            fingerprint['sha256'] = file_sha256(pdf_file)
+            current = fingerprint['sha256'] == entry['sha256']
+            if current:
+                entry['size'], entry['mtime'] = stat.st_size, stat.st_mtime
+
+        if current:
+            unchanged.append(pdf_file)
+        else:
+            to_convert[pdf_file] = fingerprint
+
+    present = {os.path.basename(pdf_file) for pdf_file in pdf_files}
+    stale = [entry for key, entry in sorted(entries.items()) if key not in present]
+
+    return to_convert, unchanged, stale
+
+def record_conversion(manifest, pdf_file, parser_version, options, result, fingerprint=None):
+    """Record a successful conversion in the manifest.
+
+    ``fingerprint`` is the one taken by plan_incremental before converting; if it
+    is missing the input is fingerprinted now.
+    """
+    if fingerprint is None:
+        stat = os.stat(pdf_file)
+        fingerprint = {'size': stat.st_size, 'mtime': stat.st_mtime, 'sha256': None}
+    manifest['files'][os.path.basename(pdf_file)] = {
+        'input': pdf_file,
+        'size': fingerprint['size'],
+        'mtime': fingerprint['mtime'],
+        'sha256': fingerprint['sha256'] or file_sha256(pdf_file),
+        'parser_version': parser_version,
+        'options': options,
+        'output': result['output'],
+        'rows': result['rows']
+    }
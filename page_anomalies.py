@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+import re
+from bisect import bisect_right
+
+from line_classifier import TRANSACTION
+from transaction import to_cents
+
+# A line that starts with a date-like token, or has a month-day date anywhere, and a dollar amount
+# looks like a transaction line
+_TRANSACTION_LIKE = re.compile(
+    r'^(?:[A-Z]{3}\s*\d|.*(?:JAN|FEB|MAR|APR|MAY|JUN|JUL|AUG|SEP|OCT|NOV|DEC)\s*\d{1,2}).*\$[\d,]+\.\d{2}.*$',
+    re.MULTILINE)
+
+# Section types whose headers are not followed by transaction lines
+SUMMARY_SECTIONS = {'balance'}
+
+def unmatched_lines(page_text, records):
+    """Return the lines of a page that look like transactions but matched no transaction pattern.
+
+    ``records`` are the page's classified lines (LineClassifier.classify_page).
+    """
+    matched = {line_end for line_end, _, classified in records if classified[0] == TRANSACTION}
+    return [match.group(0).strip() for match in _TRANSACTION_LIKE.finditer(page_text)
+            if match.end() not in matched]
+
+def empty_sections(page_text, headers, records):
+    """Return the section headers of a page with no transaction line between them and the next header."""
+    line_ends = [line_end for line_end, _, classified in records if classified[0] == TRANSACTION]
+    empty = []
+    for idx, (_, end, header, section_type) in enumerate(headers):
+        if section_type in SUMMARY_SECTIONS:
+            continue
+        next_start = headers[idx + 1][0] if idx + 1 < len(headers) else len(page_text)
+        first = bisect_right(line_ends, end)
+        if first == len(line_ends) or line_ends[first] > next_start:
+            empty.append(header)
+    return empty
+
+def describe_anomalies(unmatched, empty):
+    """Describe a page's unmatched lines and empty sections for the log."""
+    reasons = []
+    if unmatched:
+        reasons.append(f"{len(unmatched)} unmatched amount line{'s' if len(unmatched) > 1 else ''}")
+    reasons.extend(f"no transactions under {header}" for header in empty)
+    return '; '.join(reasons)
+
+class BalanceCheck:
+    """Check the transactions found against the previous and new balance printed on the statement.
+
+    The balances are looked for with the layout profile's balance patterns as
+    pages go by; amounts of the transactions found are added with ``add``.
+    """
+
+    def __init__(self, profile):
+        self.previous_regex, self.new_regex = profile.balance_regexes
+        self.previous = None
+        self.new = None
+        self.total_cents = 0
+
+    def scan(self, page_text):
+        """Look for the balances on one page of text."""
+        if self.previous is None and self.previous_regex is not None:
+            self.previous = self._find(self.previous_regex, page_text)
+        if self.new is None and self.new_regex is not None:
+            self.new = self._find(self.new_regex, page_text)
+
+    @staticmethod
+    def _find(regex, text):
+        match = regex.search(text)
+        if not match:
+            return None
+        try:
+            return to_cents(float(match.group(1).replace('$', '').replace(',', '')))
+        except ValueError:
+            return None
+
+    def add(self, amount):
+        self.total_cents += to_cents(amount)
+
+    def difference(self):
+        """Cents by which the balances and the transactions disagree, or None if the balances were not found."""
+        if self.previous is None or self.new is None:
+            return None
+        return self.new - self.previous - self.total_cents
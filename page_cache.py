@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+import os
+import time
+import hashlib
+
+DEFAULT_CACHE_PATH = os.path.join(".cache", "page_text.sqlite")
+DEFAULT_CACHE_SIZE_MB = 512
+
+def file_sha256(pdf_path, chunk_size=1024 * 1024):
+    """Return the SHA-256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(pdf_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def extractor_id(backend=None):
+    """Identify the text extractor so cached text is invalidated when it changes.
+
+    ``backend`` is an extract_backends name (default: the configured backend).
+    """
+    from extract_backends import get_backend
+    return get_backend(backend).extractor_id()
+
+class PageTextCache:
+    """On-disk cache of extracted page text keyed by PDF content hash and page number.
+
+    Entries also record the extractor and its version, so upgrading or
+    switching the PDF library never serves stale text. Documents are evicted
+    least-recently-used first once the stored text exceeds ``max_bytes``.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_CACHE_SIZE_MB * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._conn = None
+
+    def __getstate__(self):
+        # Connections can't cross process boundaries; workers reconnect lazily
+        state = self.__dict__.copy()
+        state['_conn'] = None
+        return state
+
+    def _connect(self):
+        if self._conn is None:
+            import sqlite3
+            
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    doc_hash TEXT NOT NULL,
+                    extractor TEXT NOT NULL,
+                    page_count INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (doc_hash, extractor)
+                );
+                CREATE TABLE IF NOT EXISTS pages (
+                    doc_hash TEXT NOT NULL,
+                    extractor TEXT NOT NULL,
+                    page_num INTEGER NOT NULL,
+                    text TEXT NOT NULL,
+                    PRIMARY KEY (doc_hash, extractor, page_num)
+                );
+                CREATE INDEX IF NOT EXISTS documents_last_used ON documents (last_used);
+            """)
+        return self._conn
+
+    def get_pages(self, doc_hash, extractor):
+        """Return the cached page texts for a document, or None on a miss."""
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT page_count FROM documents WHERE doc_hash = ? AND extractor = ?",
+            (doc_hash, extractor)).fetchone()
+        if row is None:
+            return None
+
+        page_texts = [text for (text,) in conn.execute(
+            "SELECT text FROM pages WHERE doc_hash = ? AND extractor = ? ORDER BY page_num",
+            (doc_hash, extractor))]
+        if len(page_texts) != row[0]:
+            # Partially written entry - treat as a miss
+            return None
+
+        with conn:
+            conn.execute(
+                "UPDATE documents SET last_used = ? WHERE doc_hash = ? AND extractor = ?",
+                (time.time(), doc_hash, extractor))
+        return page_texts
+
+    def put_pages(self, doc_hash, extractor, page_texts):
+        """Store all page texts of a document and evict old entries if over the size cap."""
+        conn = self._connect()
+        size = sum(len(text.encode('utf-8')) for text in page_texts)
+        with conn:
+            conn.execute("DELETE FROM pages WHERE doc_hash = ? AND extractor = ?", (doc_hash, extractor))
+            conn.executemany(
+                "INSERT INTO pages (doc_hash, extractor, page_num, text) VALUES (?, ?, ?, ?)",
+                [(doc_hash, extractor, page_num, text) for page_num, text in enumerate(page_texts)])
+            conn.execute(
+                "INSERT OR REPLACE INTO documents (doc_hash, extractor, page_count, size, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (doc_hash, extractor, len(page_texts), size, time.time()))
+        self.evict()
+
+    def evict(self):
+        """Drop least-recently-used documents until the cache fits in max_bytes."""
+        conn = self._connect()
+        (total,) = conn.execute("SELECT COALESCE(SUM(size), 0) FROM documents").fetchone()
+        if total <= self.max_bytes:
+            return 0
+
+        evicted = 0
+        rows = conn.execute(
+            "SELECT doc_hash, extractor, size FROM documents ORDER BY last_used").fetchall()
+        with conn:
+            for doc_hash, extractor, size in rows:
+                if total <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM pages WHERE doc_hash = ? AND extractor = ?", (doc_hash, extractor))
+                conn.execute("DELETE FROM documents WHERE doc_hash = ? AND extractor = ?", (doc_hash, extractor))
+                total -= size
+                evicted += 1
+        return evicted
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+def add_cache_arguments(parser):
+    """Add the shared --cache/--cache-size options to an argument parser."""
+    parser.add_argument('--cache', nargs='?', const=DEFAULT_CACHE_PATH, default=None, metavar='PATH',
+                        help=f'Cache extracted page text on disk (default path: {DEFAULT_CACHE_PATH})')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE_MB, metavar='MB',
+                        help=f'Maximum size of the page text cache in MB (default: {DEFAULT_CACHE_SIZE_MB})')
+
+def cache_from_args(args):
+    """Build a PageTextCache from parsed --cache/--cache-size options, or None."""
+    if not args.cache:
+        return None
+    return PageTextCache(args.cache, max_bytes=args.cache_size * 1024 * 1024)
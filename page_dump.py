@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+import os
+import gzip
+import json
+
+# Written as the first line of every dump; readers reject other formats and newer versions
+DUMP_FORMAT = "statement-page-text"
+DUMP_VERSION = 1
+DUMP_SUFFIX = ".pages.jsonl.gz"
+
+def dump_path(pdf_path, output_dir):
+    """Path of the dump of pdf_path in output_dir: <name>.pages.jsonl.gz."""
+    filename, _ = os.path.splitext(os.path.basename(pdf_path))
+    return os.path.join(output_dir, filename + DUMP_SUFFIX)
+
+def dump_stem(path):
+    """File name of a dump without its directory and suffix."""
+    name = os.path.basename(path)
+    return name[:-len(DUMP_SUFFIX)] if name.endswith(DUMP_SUFFIX) else os.path.splitext(name)[0]
+
+def write_dump(path, page_texts, source=None, sha256=None, extractor=None):
+    """Write the text of every page to a gzip-compressed JSON-lines dump.
+
+    The first line is a header with the format name, version, page count and
+    where the text came from (source file name, its SHA-256 and the text
+    extractor); each following line holds one page as ``{"page": n, "text": ...}``
+    with 1-based page numbers. The dump is written to a temporary file and
+    moved into place.
+    """
+    page_texts = list(page_texts)
+    header = {'format': DUMP_FORMAT, 'version': DUMP_VERSION, 'pages': len(page_texts),
+              'source': source, 'sha256': sha256, 'extractor': extractor}
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as f:
+            f.write(json.dumps(header).encode() + b'\n')
+            for page_num, text in enumerate(page_texts):
+                f.write(json.dumps({'page': page_num + 1, 'text': text}).encode() + b'\n')
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def read_dump_header(path):
+    """Return the header of a dump, raising ValueError if the file is not a dump this version can read."""
+    with gzip.open(path, 'rb') as f:
+        return _read_header(path, f)
+
+def _read_header(path, f):
+    try:
+        header = json.loads(f.readline())
+    except (OSError, EOFError, ValueError):
+        header = None
+    if not isinstance(header, dict) or header.get('format') != DUMP_FORMAT:
+        raise ValueError(f"{path} is not a page text dump")
+    if not isinstance(header.get('version'), int) or header['version'] > DUMP_VERSION:
+        raise ValueError(f"{path} is a version {header.get('version')} dump; "
+                         f"this version reads up to version {DUMP_VERSION}")
+    return header
+
+def iter_dump_pages(path, pages=None):
+    """Return the page count of a dump and an iterator of its page texts, one page at a time.
+
+    Pages not in ``pages`` (0-based page numbers) come out as None, as they do
+    from pdf_to_csv.iter_page_texts. Raises ValueError for files that are not
+    dumps or are from a newer version.
+    """
+    f = gzip.open(path, 'rb')
+    try:
+        header = _read_header(path, f)
+    except BaseException:
+        f.close()
+        raise
+    selected = None if pages is None else set(pages)
+
+    def page_texts():
+        with f:
+            for line in f:
+                record = json.loads(line)
+                page_num = record['page'] - 1
+                yield record['text'] if selected is None or page_num in selected else None
+
+    return header['pages'], page_texts()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+import re
+
+# A transaction line needs a month-day date and a dollar amount; continuation lines have keywords
+MONTH_DAY = re.compile(rb'(?:JAN|FEB|MAR|APR|MAY|JUN|JUL|AUG|SEP|OCT|NOV|DEC)\s*\d{1,2}')
+AMOUNT = re.compile(rb'\d\.\d\d')
+CONTINUATION = re.compile(rb'FOREIGN\s*CURRENCY|EXCHANGE\s*RATE')
+
+# Literal strings in a content stream, and hex strings (which are not <<dictionaries>>)
+LITERAL_STRING = re.compile(rb'\(((?:\\.|[^\\()])*)\)', re.DOTALL)
+HEX_STRING = re.compile(rb'(?<!<)<[0-9A-Fa-f\s]*>(?!>)')
+
+# Fonts whose string bytes are plain character codes, so the text can be read off the stream
+SIMPLE_ENCODINGS = {'/WinAnsiEncoding', '/StandardEncoding', '/MacRomanEncoding', '/PDFDocEncoding'}
+
+def parse_page_ranges(spec):
+    """Parse a 1-based page selection like "1-3,5" into a sorted list of 0-based page numbers."""
+    pages = set()
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        first, _, last = part.partition('-')
+        try:
+            first = int(first)
+            last = int(last) if last else first
+        except ValueError:
+            raise ValueError(f"Invalid page range '{part}'")
+        if first < 1 or last < first:
+            raise ValueError(f"Invalid page range '{part}'")
+        pages.update(range(first - 1, last))
+    if not pages:
+        raise ValueError(f"No pages selected by '{spec}'")
+    return sorted(pages)
+
+def _has_plain_text(page):
+    """Whether every string on the page is drawn with a simple font and no form XObjects."""
+    resources = page.get('/Resources')
+    if resources is None:
+        return False
+    resources = resources.get_object()
+
+    xobjects = resources.get('/XObject')
+    if xobjects is not None:
+        for xobject in xobjects.get_object().values():
+            if xobject.get_object().get('/Subtype') == '/Form':
+                return False
+
+    fonts = resources.get('/Font')
+    if fonts is None:
+        return True
+    for font in fonts.get_object().values():
+        font = font.get_object()
+        if font.get('/Subtype') in ('/Type0', '/Type3') or '/ToUnicode' in font:
+            return False
+        encoding = font.get('/Encoding')
+        if encoding is None:
+            # Without an encoding only the standard 14 Type1 fonts have known character codes
+            if font.get('/Subtype') != '/Type1' or '/FontDescriptor' in font:
+                return False
+        elif not isinstance(encoding.get_object(), str) or encoding.get_object() not in SIMPLE_ENCODINGS:
+            return False
+    return True
+
+def may_hold_transactions(page):
+    """Cheaply check whether a PyPDF2 page can contain transaction lines, without extracting its text.
+
+    The decoded content stream is scanned for a month-day date together with
+    an amount, or for a FOREIGN CURRENCY / EXCHANGE RATE continuation line.
+    Pages whose text cannot be read off the stream (embedded or composite
+    fonts, hex strings, form XObjects) are always kept, so the check only ever
+    skips pages it can prove have no transactions.
+    """
+    if not _has_plain_text(page):
+        return True
+    contents = page.get_contents()
+    if contents is None:
+        return False
+    data = contents.get_data()
+    if HEX_STRING.search(data):
+        return True
+
+    # Strings split up for kerning (TJ arrays) are joined back together
+    text = b''.join(LITERAL_STRING.findall(data))
+    if CONTINUATION.search(text):
+        return True
+    return bool(MONTH_DAY.search(text) and AMOUNT.search(text))
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+import time
+from itertools import chain
+
+from pdf_source import is_path, open_pdf_source, source_sha256
+from extract_backends import get_backend
+from layout_profiles import resolve_profile
+
+# Chunks handed out per worker, so a worker that finishes early can take more
+CHUNKS_PER_WORKER = 2
+
+def extract_chunk(source, page_nums, thorough=False, prefilter=False, layout=None, backend=None):
+    """Worker: extract and classify a run of pages of one PDF.
+
+    Returns ``(page_num, text, records, seconds)`` per page, where records are
+    the page's classified lines (LineClassifier.classify_page) and seconds the
+    time text extraction took. Pages skipped by the prefilter have text and
+    records None. ``layout`` and ``backend`` are the names of the layout
+    profile to classify with and the text extraction backend.
+    """
+    from pdf_to_csv import get_line_classifier
+
+    classifier = get_line_classifier(thorough, layout)
+    results = []
+    with open_pdf_source(source) as stream:
+        document = get_backend(backend).open(stream)
+        try:
+            for page_num in page_nums:
+                if prefilter and page_num > 0 and not document.may_hold_transactions(page_num):
+                    results.append((page_num, None, None, 0.0))
+                    continue
+                start = time.perf_counter()
+                text = document.page_text(page_num)
+                seconds = time.perf_counter() - start
+                results.append((page_num, text, classifier.classify_page(text), seconds))
+        finally:
+            document.close()
+    return results
+
+def split_pages(page_nums, chunk_count):
+    """Split page numbers into at most chunk_count contiguous runs of near-equal length."""
+    chunk_count = max(1, min(chunk_count, len(page_nums)))
+    size, extra = divmod(len(page_nums), chunk_count)
+    chunks = []
+    start = 0
+    for idx in range(chunk_count):
+        end = start + size + (1 if idx < extra else 0)
+        chunks.append(page_nums[start:end])
+        start = end
+    return chunks
+
+def iter_classified_pages(source, jobs, pages=None, thorough=False, prefilter=False, cache=None, profiler=None,
+                          layout=None, backend=None):
+    """Return the page count and an iterator of ``(text, records)`` per page, extracted in parallel.
+
+    Pages are split into contiguous chunks extracted and classified by
+    ``jobs`` worker processes. Results come back in page order, as soon as
+    every earlier chunk is done, so the caller can stitch pages together
+    exactly as in a sequential run. Pages not in ``pages`` (0-based) or
+    skipped by the prefilter come out as ``(None, None)``. A document found in
+    the page text cache is not extracted again; its pages come out with records
+    None, to be classified by the caller.
+    
+    The first page is extracted here, before the workers start, so the layout
+    profile (``layout``, or detected from that page) is known to all of them.
+    Every process extracts text with the same ``backend``.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    if not is_path(source) and not isinstance(source, (bytes, bytearray)):
+        # Workers need something they can open themselves
+        source = bytes(source) if isinstance(source, memoryview) else source.read()
+
+    backend = get_backend(backend)
+    if cache is not None:
+        doc_hash = source_sha256(source)
+        page_texts = cache.get_pages(doc_hash, backend.extractor_id())
+        if page_texts is not None:
+            selected = None if pages is None else set(pages)
+            return len(page_texts), ((text if selected is None or page_num in selected else None, None)
+                                     for page_num, text in enumerate(page_texts))
+
+    with open_pdf_source(source) as stream:
+        document = backend.open(stream)
+        try:
+            page_count = document.page_count
+            first_text = None
+            if page_count:
+                start = time.perf_counter()
+                first_text = document.page_text(0)
+                first_seconds = time.perf_counter() - start
+        finally:
+            document.close()
+    selected = set(range(page_count)) if pages is None else set(pages) & set(range(page_count))
+    profile = resolve_profile(layout, first_text or "")
+    first_page = None
+    if 0 in selected:
+        selected.discard(0)
+        first_page = (0, first_text, profile.classifier(thorough).classify_page(first_text), first_seconds)
+    chunks = split_pages(sorted(selected), jobs * CHUNKS_PER_WORKER)
+
+    def results():
+        extracted = []
+        for text, records in ordered_results():
+            extracted.append(text)
+            yield text, records
+        if cache is not None and None not in extracted:
+            cache.put_pages(doc_hash, backend.extractor_id(), extracted)
+
+    def ordered_results():
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = [executor.submit(extract_chunk, source, chunk, thorough, prefilter, profile.name,
+                                       backend.name)
+                       for chunk in chunks if chunk]
+            # Each chunk's results are waited for only once the earlier pages have been yielded
+            chunk_results = chain([[first_page]] if first_page else [], (future.result() for future in futures))
+            next_page = 0
+            for chunk_result in chunk_results:
+                for page_num, text, records, seconds in chunk_result:
+                    # Pages between chunks that were not selected
+                    while next_page < page_num:
+                        yield None, None
+                        next_page += 1
+                    if profiler is not None and text is not None:
+                        profiler.add('extract_text', seconds, page_num=page_num)
+                    yield text, records
+                    next_page += 1
+            while next_page < page_count:
+                yield None, None
+                next_page += 1
+
+    return page_count, results()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+import io
+import os
+import mmap
+import hashlib
+from contextlib import contextmanager
+
+def is_path(source):
+    """Whether a PDF source is a filesystem path rather than bytes or a file object."""
+    return isinstance(source, (str, os.PathLike))
+
+def source_name(source):
+    """Short name for a PDF source, for messages and profile reports."""
+    if is_path(source):
+        return os.fspath(source)
+    return getattr(source, 'name', None) or f"<{type(source).__name__}>"
+
+@contextmanager
+def open_pdf_source(source):
+    """Open a path, bytes-like object or binary file object as a seekable binary stream.
+
+    Paths are opened through a read-only memory map, so the PDF is paged in by
+    the OS instead of being copied into Python memory. File objects are used
+    as they are and left open.
+    """
+    if not is_path(source):
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            yield io.BytesIO(source)
+        else:
+            yield source
+        return
+
+    with open(source, 'rb') as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files can't be mapped; let the PDF reader report them
+            yield f
+            return
+        with mapped:
+            yield mapped
+
+def source_sha256(source, chunk_size=1024 * 1024):
+    """Return the SHA-256 hex digest of a PDF source's content."""
+    digest = hashlib.sha256()
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        digest.update(source)
+        return digest.hexdigest()
+
+    with open_pdf_source(source) as stream:
+        position = stream.tell()
+        stream.seek(0)
+        for chunk in iter(lambda: stream.read(chunk_size), b''):
+            digest.update(chunk)
+        stream.seek(position)
+    return digest.hexdigest()
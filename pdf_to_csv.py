@@ -2,59 +2,140 @@
 import os
 import re
 import csv
+import time
 import argparse
 from datetime import datetime
-from PyPDF2 import PdfReader
-
-def extract_transactions(pdf_path, verbose=False, thorough=False):
-    """Extract transaction data from a TD credit card statement PDF."""
-    # Read PDF content
-    reader = PdfReader(pdf_path)
-    all_text = ""
-    page_texts = []  # Store text from each page separately
-    
-    print(f"Total pages in PDF: {len(reader.pages)}")
-    
-    # Process each page separately and also keep combined text
-    for page_num in range(len(reader.pages)):
-        page = reader.pages[page_num]
-        page_text = page.extract_text()
-        page_texts.append(page_text)
-        all_text += page_text + "\n"
-        if verbose:
-            newline_count = page_text.count('\n')
-            print(f"Page {page_num+1} has {len(page_text)} characters and {newline_count} lines")
-    
+from contextlib import ExitStack
+from page_cache import add_cache_arguments, cache_from_args
+from pdf_source import open_pdf_source, source_sha256
+from page_filter import parse_page_ranges
+from extract_backends import add_backend_arguments, get_backend
+from page_dump import dump_stem, iter_dump_pages, read_dump_header
+from line_classifier import FOREX, RATE, TRANSACTION
+from layout_profiles import PROFILES, TD, get_profile, resolve_profile
+from duplicate_index import DuplicateIndex
+from page_anomalies import BalanceCheck, describe_anomalies, empty_sections, unmatched_lines
+from statement_context import StatementContext
+from transaction import FIELDNAMES, TransactionBatch
+from profiling import NULL_PROFILER, Profiler, print_report, write_report
+from sqlite_sink import add_sink_arguments, save_to_sqlite
+
+# Bump whenever a change can alter the transactions extracted from a statement,
+# so incremental batch runs know to re-convert previously processed files.
+PARSER_VERSION = "2"
+
+# Value of ``thorough`` that runs the second pass only on pages that look misparsed
+ADAPTIVE = 'auto'
+
+# The TD layout's patterns, kept here for callers that use them directly
+TRANSACTION_PATTERNS = TD.transaction_patterns
+THOROUGH_PATTERNS = TD.thorough_patterns
+FOREX_PATTERN = TD.forex_pattern
+RATE_PATTERN = TD.rate_pattern
+SECTION_HEADERS = TD.section_headers
+SECTION_SEGMENTER = TD.segmenter
+
+def _no_log(*args, **kwargs):
+    """Stand-in for print when running quietly."""
+
+def get_line_classifier(thorough=False, layout=None):
+    """Return the line classifier for a layout (default: TD), building it once per process."""
+    return get_profile(layout).classifier(thorough)
+
+def iter_page_texts(pdf_path, cache=None, profiler=None, pages=None, prefilter=False, backend=None):
+    """Return the page count and an iterator that extracts page text one page at a time.
+
+    ``pdf_path`` may be a path (opened through a read-only memory map), a
+    bytes-like object or a binary file object. Pages are read lazily from the
+    PDF, or straight from the page text cache if given and it already holds
+    the document. ``pages`` limits extraction to the given 0-based page
+    numbers, and ``prefilter`` skips pages that
+    page_filter.may_hold_transactions rules out (the first page, which holds
+    the statement header, is always read). Skipped pages come out as None.
+    The cache only stores documents whose pages were all extracted.
+    ``backend`` names the text extraction backend (see extract_backends;
+    default: the calibrated choice, or PyPDF2).
+    """
+    profiler = profiler or NULL_PROFILER
+    backend = get_backend(backend)
+    selected = None if pages is None else set(pages)
+    if cache is not None:
+        with profiler.stage('cache_lookup'):
+            doc_hash = source_sha256(pdf_path)
+            page_texts = cache.get_pages(doc_hash, backend.extractor_id())
+        if page_texts is not None:
+            if selected is not None:
+                page_texts = [text if page_num in selected else None for page_num, text in enumerate(page_texts)]
+            return len(page_texts), iter(page_texts)
+
+    # The source stays open until every page has been extracted; the backend's
+    # library is only imported here, so --help and cached runs don't pay for loading it
+    resources = ExitStack()
+    try:
+        with profiler.stage('pdf_open'):
+            document = backend.open(resources.enter_context(open_pdf_source(pdf_path)))
+            resources.callback(document.close)
+            page_count = document.page_count
+    except BaseException:
+        resources.close()
+        raise
+
+    def extract_pages():
+        extracted = []
+        with resources:
+            for page_num in range(page_count):
+                keep = selected is None or page_num in selected
+                if keep and prefilter and page_num > 0:
+                    with profiler.stage('prefilter', page_num):
+                        keep = document.may_hold_transactions(page_num)
+                page_text = None
+                if keep:
+                    with profiler.stage('extract_text', page_num):
+                        page_text = document.page_text(page_num)
+                if cache is not None:
+                    extracted.append(page_text)
+                yield page_text
+        if cache is not None and None not in extracted:
+            cache.put_pages(doc_hash, backend.extractor_id(), extracted)
+
+    return page_count, extract_pages()
+
+def read_page_texts(pdf_path, cache=None, backend=None):
+    """Return the extracted text of every page of a PDF path, bytes or file object.
+
+    Uses the page text cache if given, and the named extraction backend.
+    """
+    _, page_texts = iter_page_texts(pdf_path, cache, backend=backend)
+    return list(page_texts)
+
+def match_statement_date(text, layout=None):
+    """Search text for the STATEMENT DATE header, trying the most structured format first."""
+    return get_profile(layout).match_statement_date(text)
+
+def match_statement_period(text, layout=None):
+    """Search text for the STATEMENT PERIOD header in any of its known formats."""
+    return get_profile(layout).match_statement_period(text)
+
+def build_statement_context(date_match, period_match, log=print):
+    """Work out the statement month and the years transactions can fall in.
+
+    Returns a StatementContext used to resolve every transaction date.
+    Messages go through ``log``.
+    """
     # Extract statement date to get correct year
     statement_year = datetime.now().year
     statement_month = None
-    # Try various formats starting with the most structured one
-    date_match = re.search(r'STATEMENT DATE:\s*(\w+)\s+(\d{1,2}),\s*(\d{4})', all_text)
-    if not date_match:
-        # Try with no space between month and day but with comma
-        date_match = re.search(r'STATEMENT DATE:\s*(\w+?)(\d{1,2}),\s*(\d{4})', all_text)
-    if not date_match:
-        # Try with no spaces and no comma
-        date_match = re.search(r'STATEMENT DATE:(\w+?)(\d{1,2})(\d{4})', all_text)
     if date_match:
         statement_month = date_match.group(1)
         statement_day = int(date_match.group(2))
         statement_year = int(date_match.group(3))
-        print(f"Statement date: {statement_month} {statement_day}, {statement_year}")
+        log(f"Statement date: {statement_month} {statement_day}, {statement_year}")
     else:
-        print("Warning: Could not find statement date. Using current year.")
+        log("Warning: Could not find statement date. Using current year.")
     
     # Extract statement period to determine transaction years
     start_year = statement_year
     end_year = statement_year
-    # Try various formats for statement period
-    period_match = re.search(r'STATEMENT PERIOD:\s*(\w+)\s+(\d{1,2}),\s*(\d{4})\s*to\s*(\w+)\s+(\d{1,2}),\s*(\d{4})', all_text)
-    if not period_match:
-        # Try with no spaces between month and day
-        period_match = re.search(r'STATEMENT PERIOD:\s*(\w+?)(\d{1,2}),?(\d{4})\s*to\s*(\w+?)(\d{1,2}),?(\d{4})', all_text)
-    if not period_match:
-        # Try with no spaces at all
-        period_match = re.search(r'STATEMENT PERIOD:\s*(\w+?)(\d{1,2})(\d{4})to(\w+?)(\d{1,2})(\d{4})', all_text)
     if period_match:
         start_month = period_match.group(1)
         start_day = period_match.group(2)
@@ -62,372 +143,549 @@ def extract_transactions(pdf_path, verbose=False, thorough=False):
         end_month = period_match.group(4)
         end_day = period_match.group(5)
         end_year = int(period_match.group(6))
-        print(f"Statement period: {start_month} {start_day}, {start_year} to {end_month} {end_day}, {end_year}")
+        log(f"Statement period: {start_month} {start_day}, {start_year} to {end_month} {end_day}, {end_year}")
         
         # Verify if years are correct - they should typically be the same or 1 year apart
         if start_year != end_year and abs(start_year - end_year) > 1:
-            print(f"Warning: Statement period spans multiple years: {start_year} to {end_year}.")
+            log(f"Warning: Statement period spans multiple years: {start_year} to {end_year}.")
             # Adjust to use the statement year as primary reference
             start_year = statement_year
             end_year = statement_year
-            print(f"Adjusted to use statement year for all transactions: {statement_year}")
+            log(f"Adjusted to use statement year for all transactions: {statement_year}")
     else:
-        print("Warning: Could not find statement period. Using statement year for all transactions.")
+        log("Warning: Could not find statement period. Using statement year for all transactions.")
+
+    return StatementContext(statement_month, start_year, end_year, log)
+
+def iter_transactions(pdf_path, verbose=False, thorough=False, cache=None, profiler=None, pages=None,
+                      prefilter=False, quiet=False, page_jobs=None, layout=None, from_dump=False, backend=None):
+    """Yield transactions from a TD credit card statement PDF, page by page.
+
+    Each transaction is yielded as soon as the line after it shows it is
+    complete, so the first rows are available before the last page has been
+    parsed and only one page of text is held in memory. The open transaction is
+    carried across page boundaries so FOREIGN CURRENCY and EXCHANGE RATE lines at
+    the top of a page still attach to it. Transactions come out in document
+    order; in thorough mode the extra page-analysis transactions follow at the
+    end. Pages are only buffered until the statement date and period headers
+    (normally on page 1) have been found. Pass a Profiler to record how long
+    each stage and page takes.
+    
+    ``pages`` restricts parsing to the given 0-based page numbers; the first
+    page is still read for the statement header. ``prefilter`` skips
+    extracting pages that cannot hold transactions, such as rate disclosure
+    and legal boilerplate pages.
+    
+    ``pdf_path`` may also be a bytes-like object or a binary file object.
+    With ``quiet`` nothing is printed, so the parser can be embedded in a
+    long-running process.
+    
+    With ``page_jobs`` above 1, pages are extracted and classified by that
+    many worker processes (see parallel_extract) and stitched back together
+    here in page order, so the result is the same as a sequential run.
+    
+    ``layout`` names the statement layout profile (see layout_profiles); by
+    default it is detected from the first page, and that page's template is
+    remembered so later statements of the same template skip detection.
+    
+    With ``thorough`` set to ADAPTIVE ('auto'), the main pass runs with the
+    fast patterns only and the thorough second pass runs just on pages that
+    look misparsed: pages with dollar-amount lines no pattern matched, or
+    section headers with no transactions under them. If the transactions
+    found don't add up to the difference between the previous and new balance
+    printed on the statement, every page gets the second pass. Pages are then
+    held in memory until the end of the statement.
+    
+    With ``from_dump``, ``pdf_path`` is a page text dump written by
+    ``debug_pdf.py --dump`` and its pages go straight to the parser, without
+    opening a PDF (``prefilter``, ``page_jobs`` and ``cache`` don't apply).
+    
+    ``backend`` names the text extraction backend (see extract_backends).
+    Backends other than PyPDF2 can't rule pages out before extracting them,
+    so ``prefilter`` keeps every page with them.
+    """
+    profiler = profiler or NULL_PROFILER
+    log = _no_log if quiet else print
+    adaptive = thorough == ADAPTIVE
+    if adaptive:
+        thorough = False
+    
+    # Read PDF content one page at a time
+    read_pages = None if pages is None else sorted(set(pages) | {0})
+    if from_dump:
+        page_count, page_texts = iter_dump_pages(pdf_path, read_pages)
+        page_results = ((page_text, None) for page_text in page_texts)
+    elif page_jobs and page_jobs > 1:
+        from parallel_extract import iter_classified_pages
+        page_count, page_results = iter_classified_pages(pdf_path, page_jobs, read_pages, thorough, prefilter,
+                                                         cache, profiler, layout, backend)
+    else:
+        page_count, page_texts = iter_page_texts(pdf_path, cache, profiler, read_pages, prefilter, backend)
+        page_results = ((page_text, None) for page_text in page_texts)
+    parse_pages = None if pages is None else set(pages)
+    
+    log(f"Total pages in PDF: {page_count}")
+    
+    # Layout profile with its line classifier and section segmenter, set from the first page
+    profile = None
+    classifier = None
     
-    # Parse transactions - process the entire document
-    transactions = []
+    if thorough:
+        log("Performing thorough analysis of each page...")
+    elif adaptive:
+        log("Adaptive mode: thorough analysis of flagged pages only")
+    
+    # Statement years are unknown until the header has been seen, so hold pages back until then
+    header_text = ""
+    pending_pages = []
+    date_match = None
+    period_match = None
+    context = None
+    
+    # State carried from one page to the next
     current_transaction = None
+    current_section = None  # Section type the last header seen started
     transaction_count = 0
+    duplicate_index = DuplicateIndex()  # (date, cents) of every transaction, for thorough dedupe
+    page_candidates = []  # Transactions found by the thorough page analysis
+    transactions_found = 0
+    balance_check = None  # Statement balances, in adaptive mode
+    unflagged_pages = []  # Pages that may still need the second pass if the balances don't add up
+    flagged_pages = 0
     
-    # Transaction patterns
-    patterns = [
-        # Standard format: JAN15JAN17 $12.34 MERCHANT NAME
-        r'([A-Z]{3}\s*\d{1,2})([A-Z]{3}\s*\d{1,2})\s+(-?\$[\d,]+\.\d{2})\s+(.*)',
+    def parse_page(page_num, page_text, records=None):
+        """Run the main pass (and thorough analysis) over one page, yielding finished transactions.
+
+        ``records`` are the page's already classified lines, if a page worker did that.
+        """
+        nonlocal current_transaction, current_section, transaction_count, flagged_pages
         
-        # Alternate format with space between dates: JAN15 JAN17 $12.34 MERCHANT
-        r'([A-Z]{3}\s*\d{1,2})\s+([A-Z]{3}\s*\d{1,2})\s+(-?\$[\d,]+\.\d{2})\s+(.*)',
+        # Timed as the main pass, including any time the consumer spends between yields
+        main_pass_start = time.perf_counter()
+        parse_date = profiler.wrap('parse_date', context.parse_date)
         
-        # Format with different date style: JAN 15JAN 17 $12.34 MERCHANT
-        r'([A-Z]{3}\s+\d{1,2})([A-Z]{3}\s+\d{1,2})\s+(-?\$[\d,]+\.\d{2})\s+(.*)'
-    ]
-    
-    # Add more thorough patterns if requested
-    if thorough:
-        patterns.extend([
-            # Even more flexible pattern with possible text between dates and amount
-            r'([A-Z]{3}\s*\d{1,2}).*?([A-Z]{3}\s*\d{1,2}).*?(-?\$[\d,]+\.\d{2})\s+(.*)',
-            
-            # Pattern with just one date and amount
-            r'([A-Z]{3}\s*\d{1,2}).*?(-?\$[\d,]+\.\d{2})\s+(.*)'
-        ])
-    
-    # Compile all patterns
-    transaction_patterns = [re.compile(pattern, re.MULTILINE) for pattern in patterns]
-    
-    # First pass: Process whole document line by line
-    lines = all_text.split('\n')
-    for line_idx, line in enumerate(lines):
-        # Skip empty lines
-        if not line.strip():
-            continue
+        # Find the section headers once; the main pass tracks which section each line is in
+        headers = profile.segmenter.find_headers(page_text)
+        page_section = current_section
+        next_header = 0
         
-        # Try each transaction pattern
-        main_match = None
-        pattern_used = -1
-        for pattern_idx, pattern in enumerate(transaction_patterns):
-            match = pattern.match(line.strip())
-            if match:
-                main_match = match
-                pattern_used = pattern_idx
-                if verbose:
-                    print(f"Match found with pattern {pattern_idx+1}: {line.strip()}")
-                break
-                
-        # Check for foreign currency line
-        forex_match = re.match(r'FOREIGN CURRENCY\s+([\d,.]+)\s*([A-Z]{3})', line.strip())
+        # Classify each line in a single pass; empty and noise lines are left out
+        if records is None:
+            records = classifier.classify_page(page_text)
         
-        # Check for exchange rate line
-        rate_match = re.match(r'@\s*EXCHANGE\s*RATE\s*([\d,.]+)', line.strip())
+        # In adaptive mode, a page that looks misparsed gets the thorough treatment
+        page_thorough = thorough
+        if adaptive:
+            with profiler.stage('anomaly_check', page_num):
+                balance_check.scan(page_text)
+                unmatched = unmatched_lines(page_text, records)
+                empty = empty_sections(page_text, headers, records)
+            if unmatched or empty:
+                flagged_pages += 1
+                page_thorough = True
+                log(f"Page {page_num+1} flagged ({describe_anomalies(unmatched, empty)}), running thorough analysis")
+                if unmatched:
+                    records = profile.classifier(True).classify_page(page_text)
         
-        if main_match:
-            transaction_count += 1
-            
-            # If we were processing a previous transaction, add it to our list
-            if current_transaction:
-                transactions.append(current_transaction)
+        # Process the page line by line
+        for line_end, line, classified in records:
+            while next_header < len(headers) and headers[next_header][0] < line_end:
+                current_section = headers[next_header][3]
+                next_header += 1
+            kind = classified[0]
             
-            # Process based on pattern type
-            if pattern_used < 3:  # Standard patterns with two dates
-                transaction_date = main_match.group(1).replace(' ', '')
-                posting_date = main_match.group(2).replace(' ', '')
-                amount_str = main_match.group(3).replace('$', '').replace(',', '')
-                description = main_match.group(4).strip()
+            if kind == TRANSACTION:
+                _, pattern_used, transaction_date, posting_date, amount_str, description = classified
+                transaction_count += 1
+                if verbose:
+                    log(f"Match found with pattern {pattern_used+1}: {line.strip()}")
                 
-                # Parse the dates
-                trans_date = parse_short_date(transaction_date, start_year, end_year, statement_month)
-                post_date = parse_short_date(posting_date, start_year, end_year, statement_month)
-            elif pattern_used == 3:  # Extended pattern with text between dates
-                transaction_date = main_match.group(1).replace(' ', '')
-                posting_date = main_match.group(2).replace(' ', '')
-                amount_str = main_match.group(3).replace('$', '').replace(',', '')
-                description = main_match.group(4).strip()
+                # If we were processing a previous transaction, it is now complete
+                if current_transaction:
+                    duplicate_index.add(current_transaction['transaction_date'], current_transaction['amount'])
+                    yield current_transaction
                 
                 # Parse the dates
-                trans_date = parse_short_date(transaction_date, start_year, end_year, statement_month)
-                post_date = parse_short_date(posting_date, start_year, end_year, statement_month)
-            else:  # Single date pattern
-                transaction_date = main_match.group(1).replace(' ', '')
-                amount_str = main_match.group(2).replace('$', '').replace(',', '')
-                description = main_match.group(3).strip()
+                trans_date = parse_date(transaction_date)
+                if posting_date is not None:
+                    post_date = parse_date(posting_date)
+                else:  # Single date pattern - use the same date for both fields
+                    post_date = trans_date
                 
-                # Use the same date for both fields
-                trans_date = parse_short_date(transaction_date, start_year, end_year, statement_month)
-                post_date = trans_date
-            
-            # Handle negative amounts (payments/credits)
-            try:
-                amount = float(amount_str)
-            except ValueError:
-                print(f"Warning: Could not convert amount '{amount_str}' to float. Setting to 0.")
-                amount = 0.0
+                # Handle negative amounts (payments/credits)
+                try:
+                    amount = float(amount_str)
+                except ValueError:
+                    log(f"Warning: Could not convert amount '{amount_str}' to float. Setting to 0.")
+                    amount = 0.0
+                if balance_check is not None:
+                    balance_check.add(amount)
+                
+                current_transaction = {
+                    'transaction_date': trans_date,
+                    'posting_date': post_date,
+                    'description': description,
+                    'amount': amount,
+                    'foreign_amount': None,
+                    'foreign_currency': None,
+                    'exchange_rate': None,
+                    'section': current_section
+                }
+                
+                if verbose:
+                    log(f"Found transaction: {trans_date} | {description} | ${amount:.2f}")
             
-            current_transaction = {
-                'transaction_date': trans_date,
-                'posting_date': post_date,
-                'description': description,
-                'amount': amount,
-                'foreign_amount': None,
-                'foreign_currency': None,
-                'exchange_rate': None
-            }
+            elif kind == FOREX and current_transaction:
+                # Add foreign currency info to the current transaction
+                _, foreign_amount, foreign_currency = classified
+                
+                try:
+                    current_transaction['foreign_amount'] = float(foreign_amount)
+                except ValueError:
+                    log(f"Warning: Could not convert foreign amount '{foreign_amount}' to float. Setting to 0.")
+                    current_transaction['foreign_amount'] = 0.0
+                    
+                current_transaction['foreign_currency'] = foreign_currency
+                
+                # Update description to include the foreign currency information
+                if not current_transaction['description'].endswith(')'):
+                    if not current_transaction['description'].endswith(','):
+                        current_transaction['description'] += ' '
+                    current_transaction['description'] += f"({foreign_amount} {foreign_currency})"
+                    
+                if verbose:
+                    log(f"  - Added foreign currency: {foreign_amount} {foreign_currency}")
             
+            elif kind == RATE and current_transaction:
+                # Add exchange rate info to current transaction
+                _, exchange_rate = classified
+                try:
+                    current_transaction['exchange_rate'] = float(exchange_rate)
+                except ValueError:
+                    log(f"Warning: Could not convert exchange rate '{exchange_rate}' to float. Setting to 0.")
+                    current_transaction['exchange_rate'] = 0.0
+                    
+                if verbose:
+                    log(f"  - Added exchange rate: {exchange_rate}")
+        
+        # Headers after the last classified line still set the section the next page starts in
+        if next_header < len(headers):
+            current_section = headers[-1][3]
+        
+        profiler.add('main_pass', time.perf_counter() - main_pass_start, page_num=page_num)
+        
+        # Second pass: Analyze the page separately if thorough mode is enabled (or the page was flagged)
+        if page_thorough:
+            with profiler.stage('thorough_pass', page_num):
+                page_candidates.extend(analyze_page(page_num, page_text, context, verbose,
+                                                    headers, page_section, profiler, log, profile.segmenter))
+        elif adaptive:
+            unflagged_pages.append((page_num, page_text, headers, page_section))
+    
+    for page_num, (page_text, page_records) in enumerate(page_results):
+        if page_text is None:
             if verbose:
-                print(f"Found transaction: {trans_date} | {description} | ${amount:.2f}")
+                log(f"Page {page_num+1} skipped")
+            continue
+        if verbose:
+            newline_count = page_text.count('\n')
+            log(f"Page {page_num+1} has {len(page_text)} characters and {newline_count} lines")
+        selected = parse_pages is None or page_num in parse_pages
         
-        elif forex_match and current_transaction:
-            # Add foreign currency info to the current transaction
-            foreign_amount = forex_match.group(1).replace(',', '')
-            foreign_currency = forex_match.group(2)
-            
-            try:
-                current_transaction['foreign_amount'] = float(foreign_amount)
-            except ValueError:
-                print(f"Warning: Could not convert foreign amount '{foreign_amount}' to float. Setting to 0.")
-                current_transaction['foreign_amount'] = 0.0
-                
-            current_transaction['foreign_currency'] = foreign_currency
+        if profile is None:
+            with profiler.stage('layout_detection'):
+                profile = resolve_profile(layout, page_text)
+            classifier = profile.classifier(thorough)
+            if adaptive:
+                balance_check = BalanceCheck(profile)
+            log(f"Statement layout: {profile.name} ({profile.issuer})")
+        
+        if context is None:
+            # Look for the statement date and period in the pages seen so far
+            if selected:
+                pending_pages.append((page_num, page_text, page_records))
+            header_text += page_text + "\n"
+            with profiler.stage('header_detection'):
+                date_match = date_match or profile.match_statement_date(header_text)
+                period_match = period_match or profile.match_statement_period(header_text)
+            if not (date_match and period_match):
+                continue
             
-            # Update description to include the foreign currency information
-            if not current_transaction['description'].endswith(')'):
-                if not current_transaction['description'].endswith(','):
-                    current_transaction['description'] += ' '
-                current_transaction['description'] += f"({foreign_amount} {foreign_currency})"
-                
-            if verbose:
-                print(f"  - Added foreign currency: {foreign_amount} {foreign_currency}")
+            with profiler.stage('header_detection'):
+                context = build_statement_context(date_match, period_match, log)
+            header_text = ""
+            for pending_num, pending_text, pending_records in pending_pages:
+                for transaction in parse_page(pending_num, pending_text, pending_records):
+                    transactions_found += 1
+                    yield transaction
+            pending_pages = []
+            continue
         
-        elif rate_match and current_transaction:
-            # Add exchange rate info to current transaction
-            exchange_rate = rate_match.group(1).replace(',', '')
-            try:
-                current_transaction['exchange_rate'] = float(exchange_rate)
-            except ValueError:
-                print(f"Warning: Could not convert exchange rate '{exchange_rate}' to float. Setting to 0.")
-                current_transaction['exchange_rate'] = 0.0
-                
-            if verbose:
-                print(f"  - Added exchange rate: {exchange_rate}")
+        if not selected:
+            continue
+        for transaction in parse_page(page_num, page_text, page_records):
+            transactions_found += 1
+            yield transaction
+    
+    # Headers never completed - fall back to whatever was found across the whole document
+    if context is None:
+        context = build_statement_context(date_match, period_match, log)
+        for pending_num, pending_text, pending_records in pending_pages:
+            for transaction in parse_page(pending_num, pending_text, pending_records):
+                transactions_found += 1
+                yield transaction
     
     # Don't forget the last transaction
     if current_transaction:
-        transactions.append(current_transaction)
+        duplicate_index.add(current_transaction['transaction_date'], current_transaction['amount'])
+        transactions_found += 1
+        yield current_transaction
     
-    # Second pass: Analyze each page separately if thorough mode is enabled
-    if thorough:
-        print("\nPerforming thorough analysis of each page...")
-        page_transactions = []
-        
-        for page_num, page_text in enumerate(page_texts):
+    # Add the thorough-analysis transactions that the main pass did not already capture
+    page_transactions = []
+    
+    def add_candidates():
+        for candidate in page_candidates:
+            # Skip candidates already captured by the main pass or an earlier candidate
+            if duplicate_index.add_if_new(candidate['transaction_date'], candidate['amount']):
+                page_transactions.append(candidate)
+                if balance_check is not None:
+                    balance_check.add(candidate['amount'])
+                if verbose:
+                    log(f"  Added new transaction: {candidate['transaction_date']} | "
+                          f"{candidate['description']} | ${candidate['amount']:.2f}")
+        page_candidates.clear()
+    
+    if thorough or adaptive:
+        add_candidates()
+    
+    # Balances that still don't add up mean a missed transaction somewhere: check the pages not flagged yet
+    if adaptive and balance_check is not None:
+        difference = balance_check.difference() if parse_pages is None else None
+        if difference:
+            log(f"Transactions differ from the statement balances by "
+                f"{'-' if difference < 0 else ''}${abs(difference) / 100:,.2f}, "
+                f"running thorough analysis of the other {len(unflagged_pages)} pages")
+            for pending_num, pending_text, pending_headers, pending_section in unflagged_pages:
+                with profiler.stage('thorough_pass', pending_num):
+                    page_candidates.extend(analyze_page(pending_num, pending_text, context, verbose, pending_headers,
+                                                        pending_section, profiler, log, profile.segmenter))
+            add_candidates()
+        elif verbose:
+            log(f"Adaptive mode: {flagged_pages} page(s) flagged, balance check "
+                f"{'passed' if difference == 0 else 'not available'}")
+        unflagged_pages = []
+    
+    if thorough or adaptive:
+        if duplicate_index.suppressed:
+            log(f"Suppressed {duplicate_index.suppressed} duplicate candidates during thorough analysis.")
+        if page_transactions:
+            log(f"Found {len(page_transactions)} additional transactions during thorough analysis.")
+        for transaction in page_transactions:
+            transactions_found += 1
+            yield transaction
+    
+    log(f"Found total of {transactions_found} transactions (from {transaction_count} transaction lines).")
+
+def analyze_page(page_num, page_text, context, verbose=False, headers=None, section=None, profiler=None,
+                 log=print, segmenter=None):
+    """Look for transactions on one page using loose heuristics (thorough mode).
+
+    The page is cut into non-overlapping sections at the section headers, so
+    each line is visited once. ``context`` is the statement's StatementContext,
+    ``headers`` are the page's section headers if
+    already found, and ``section`` is the section type carried over from the
+    previous page, used for lines before the first header. Returns candidate
+    transactions; the caller drops the ones the main pass already found.
+    Verbose messages go through ``log``. ``segmenter`` is the layout's
+    SectionSegmenter (default: TD).
+    """
+    candidates = []
+    parse_date = (profiler or NULL_PROFILER).wrap('parse_date', context.parse_date)
+    if verbose:
+        log(f"\nAnalyzing page {page_num+1}:")
+    
+    # Cut the page into transaction sections; if no sections are found the whole page is used
+    transaction_sections = (segmenter or SECTION_SEGMENTER).segment(page_text, headers)
+    
+    # Process each section
+    for section_type, header, section_text in transaction_sections:
+        if header is not None:
+            section = section_type
             if verbose:
-                print(f"\nAnalyzing page {page_num+1}:")
-            
-            # Look for transaction sections on this page
-            transaction_sections = []
-            
-            # Common section headers in TD statements
-            section_headers = [
-                "TRANSACTIONS", 
-                "PURCHASES AND ADJUSTMENTS",
-                "PAYMENTS AND CREDITS",
-                "YOUR TRANSACTIONS",
-                "PREVIOUS STATEMENT BALANCE",
-                "YOUR ACCOUNT TRANSACTIONS"
-            ]
-            
-            # Try to find transaction sections
-            for header in section_headers:
-                if header in page_text:
-                    if verbose:
-                        print(f"Found transaction section: {header}")
-                    
-                    # Extract the section following the header
-                    start_idx = page_text.find(header) + len(header)
-                    section_text = page_text[start_idx:]
-                    transaction_sections.append(section_text)
-            
-            # If no sections found, use the whole page
-            if not transaction_sections:
-                transaction_sections = [page_text]
-            
-            # Process each section
-            for section in transaction_sections:
-                section_lines = section.split('\n')
+                log(f"Found transaction section: {header}")
+        
+        section_lines = section_text.split('\n')
+        
+        # Process each line with regular expression pattern
+        for line in section_lines:
+            if not line.strip():
+                continue
+                
+            # Look for patterns that might indicate a transaction
+            # Simplified pattern: anything with a month abbr, a day number, and a dollar amount
+            if (re.search(r'[A-Z]{3}', line.upper()) and 
+                re.search(r'\d{1,2}', line) and 
+                re.search(r'\$\d+\.\d{2}', line)):
+                
+                if verbose:
+                    log(f"Potential transaction: {line}")
                 
-                # Process each line with regular expression pattern
-                for line in section_lines:
-                    if not line.strip():
+                # Try to extract date, amount and description
+                date_match = re.search(r'([A-Z]{3}\s*\d{1,2})', line.upper())
+                amount_match = re.search(r'(-?\$[\d,]+\.\d{2})', line)
+                
+                if date_match and amount_match:
+                    date_str = date_match.group(1).replace(' ', '')
+                    amount_str = amount_match.group(1).replace('$', '').replace(',', '')
+                    
+                    try:
+                        amount = float(amount_str)
+                    except ValueError:
                         continue
                         
-                    # Look for patterns that might indicate a transaction
-                    # Simplified pattern: anything with a month abbr, a day number, and a dollar amount
-                    if (re.search(r'[A-Z]{3}', line.upper()) and 
-                        re.search(r'\d{1,2}', line) and 
-                        re.search(r'\$\d+\.\d{2}', line)):
-                        
-                        if verbose:
-                            print(f"Potential transaction: {line}")
-                        
-                        # Try to extract date, amount and description
-                        date_match = re.search(r'([A-Z]{3}\s*\d{1,2})', line.upper())
-                        amount_match = re.search(r'(-?\$[\d,]+\.\d{2})', line)
-                        
-                        if date_match and amount_match:
-                            date_str = date_match.group(1).replace(' ', '')
-                            amount_str = amount_match.group(1).replace('$', '').replace(',', '')
-                            
-                            try:
-                                amount = float(amount_str)
-                            except ValueError:
-                                continue
-                                
-                            # Extract description by removing date and amount
-                            description = line
-                            
-                            # Replace the matched date and amount
-                            description = description.replace(date_match.group(0), '')
-                            description = description.replace(amount_match.group(0), '')
-                            
-                            # Clean up the description
-                            description = re.sub(r'\s+', ' ', description).strip()
-                            
-                            if not description:
-                                description = "Unknown merchant"
-                            
-                            # Create transaction
-                            trans_date = parse_short_date(date_str, start_year, end_year, statement_month)
-                            
-                            # Check if this transaction is already captured
-                            is_duplicate = False
-                            for t in transactions:
-                                if (t['transaction_date'] == trans_date and 
-                                    abs(t['amount'] - amount) < 0.01):
-                                    is_duplicate = True
-                                    break
-                            
-                            if not is_duplicate:
-                                new_transaction = {
-                                    'transaction_date': trans_date,
-                                    'posting_date': trans_date,  # Use same date for both
-                                    'description': description,
-                                    'amount': amount,
-                                    'foreign_amount': None,
-                                    'foreign_currency': None,
-                                    'exchange_rate': None
-                                }
-                                page_transactions.append(new_transaction)
-                                if verbose:
-                                    print(f"  Added new transaction: {trans_date} | {description} | ${amount:.2f}")
-        
-        # Add new transactions found
-        if page_transactions:
-            print(f"Found {len(page_transactions)} additional transactions during thorough analysis.")
-            transactions.extend(page_transactions)
+                    # Extract description by removing date and amount
+                    description = line
+                    
+                    # Replace the matched date and amount
+                    description = description.replace(date_match.group(0), '')
+                    description = description.replace(amount_match.group(0), '')
+                    
+                    # Clean up the description
+                    description = re.sub(r'\s+', ' ', description).strip()
+                    
+                    if not description:
+                        description = "Unknown merchant"
+                    
+                    # Create transaction
+                    trans_date = parse_date(date_str)
+                    
+                    candidates.append({
+                        'transaction_date': trans_date,
+                        'posting_date': trans_date,  # Use same date for both
+                        'description': description,
+                        'amount': amount,
+                        'foreign_amount': None,
+                        'foreign_currency': None,
+                        'exchange_rate': None,
+                        'section': section
+                    })
     
-    print(f"Found total of {len(transactions)} transactions (from {transaction_count} transaction lines).")
+    return candidates
+
+def extract_transactions(pdf_path, verbose=False, thorough=False, cache=None, profiler=None, pages=None,
+                         prefilter=False, quiet=False, page_jobs=None, layout=None, from_dump=False,
+                         backend=None):
+    """Extract transaction data from a TD credit card statement PDF.
+
+    ``pdf_path`` may be a path, a bytes-like object or a binary file object;
+    with ``quiet`` nothing is printed. ``page_jobs`` spreads the pages of the
+    PDF over that many worker processes. ``layout`` forces a layout profile
+    instead of detecting it. ``thorough`` may be ADAPTIVE ('auto') to run the
+    thorough analysis only where the statement looks misparsed. With
+    ``from_dump``, ``pdf_path`` is a page text dump instead of a PDF.
+    ``backend`` names the PDF text extraction backend.
+    """
+    transactions = list(iter_transactions(pdf_path, verbose=verbose, thorough=thorough, cache=cache,
+                                          profiler=profiler, pages=pages, prefilter=prefilter, quiet=quiet,
+                                          page_jobs=page_jobs, layout=layout, from_dump=from_dump,
+                                          backend=backend))
     
     # Sort transactions by date
-    transactions.sort(key=lambda x: x['transaction_date'])
+    with (profiler or NULL_PROFILER).stage('sort'):
+        transactions.sort(key=lambda x: x['transaction_date'])
     
     return transactions
 
 def parse_short_date(date_str, start_year, end_year, statement_month):
-    """Parse dates like 'DEC8' into a full date string."""
-    # Extract month and day
-    month_match = re.match(r'([A-Z]{3})\s*(\d{1,2})', date_str)
-    if not month_match:
-        # Try alternative formats
-        alt_month_match = re.match(r'(\w{3})[-\s\.]*(\d{1,2})', date_str, re.IGNORECASE)
-        if not alt_month_match:
-            print(f"Warning: Could not parse date format: '{date_str}', returning as is.")
-            return date_str
-        month_abbr = alt_month_match.group(1).upper()
-        day = int(alt_month_match.group(2))
-    else:
-        month_abbr = month_match.group(1)
-        day = int(month_match.group(2))
-    
-    # Convert month abbreviation to number
-    months = {
-        'JAN': 1, 'FEB': 2, 'MAR': 3, 'APR': 4, 'MAY': 5, 'JUN': 6,
-        'JUL': 7, 'AUG': 8, 'SEP': 9, 'OCT': 10, 'NOV': 11, 'DEC': 12
-    }
-    
-    month_num = months.get(month_abbr, 1)
-    if month_abbr not in months:
-        print(f"Warning: Unknown month abbreviation '{month_abbr}' in date '{date_str}'. Using January.")
-    
-    # Convert statement_month to a month number for comparison
-    statement_month_num = None
-    for m, num in months.items():
-        if statement_month and statement_month.upper().startswith(m):
-            statement_month_num = num
-            break
-    
-    # Determine year based on statement period and month number
-    year = end_year  # Default to end_year
-    
-    # Only apply year adjustments if we have a valid statement month
-    if statement_month_num is not None:
-        # If transaction is from a month significantly earlier than the statement month,
-        # it likely belongs to the end_year (current statement year)
-        # If it's from a month significantly later, it might be from the previous year (start_year)
+    """Parse dates like 'DEC8' into a full date string.
+
+    Builds a one-off StatementContext; when parsing many dates from the same
+    statement, build the context once and call its parse_date instead.
+    """
+    return StatementContext(statement_month, start_year, end_year).parse_date(date_str)
+
+def save_to_csv(transactions, output_path, stream=False):
+    """Save extracted transactions to a CSV file.
+
+    ``transactions`` is a list of transaction dicts or a TransactionBatch.
+
+    The file is written under a temporary name and renamed into place. With
+    ``stream=True``, ``transactions`` may be any iterable (such as
+    iter_transactions) and each row is written to the file as soon as it
+    arrives; the file is only created once the first transaction is available.
+    """
+    fieldnames = FIELDNAMES
+    
+    # Write next to the target and move it into place, so readers never see a partial file
+    tmp_path = output_path + ".tmp"
+
+    if stream:
+        csvfile = None
+        count = 0
+        try:
+            try:
+                for transaction in transactions:
+                    if csvfile is None:
+                        csvfile = open(tmp_path, 'w', newline='')
+                        writer = csv.DictWriter(csvfile, fieldnames=fieldnames, extrasaction='ignore')
+                        writer.writeheader()
+                    writer.writerow(transaction)
+                    count += 1
+            finally:
+                if csvfile is not None:
+                    csvfile.close()
+            if count:
+                os.replace(tmp_path, output_path)
+        except BaseException as e:
+            # Parsing errors raised by the iterable land here too; drop the partial file either way
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            if not isinstance(e, (OSError, csv.Error)):
+                raise
+            print(f"Error saving to CSV: {e}")
+            return False
         
-        # For statements in the first few months of the year
-        if statement_month_num <= 3:  # Jan, Feb, Mar
-            if month_num >= 10:  # Oct, Nov, Dec
-                # Late months in a statement from early in the year are likely from previous year
-                year = start_year
-                
-        # For statements in the last few months of the year
-        elif statement_month_num >= 10:  # Oct, Nov, Dec
-            if month_num <= 3:  # Jan, Feb, Mar
-                # Early months in a statement from late in the year are likely from next year
-                year = end_year
-                # Ensure we don't inadvertently use the wrong year based on statement period
-                if end_year > start_year:
-                    year = end_year
-                else:
-                    year = start_year + 1
-    
-    # Format the date
-    return f"{year}-{month_num:02d}-{day:02d}"
-
-def save_to_csv(transactions, output_path):
-    """Save extracted transactions to a CSV file."""
+        if not count:
+            print("No transactions found to save.")
+            return False
+        print(f"Successfully saved {count} transactions to {output_path}")
+        return True
+    
     if not transactions:
         print("No transactions found to save.")
         return False
         
     try:
-        with open(output_path, 'w', newline='') as csvfile:
-            fieldnames = ['transaction_date', 'posting_date', 'description', 'amount', 
-                          'foreign_amount', 'foreign_currency', 'exchange_rate']
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            
-            writer.writeheader()
-            for transaction in transactions:
-                writer.writerow(transaction)
+        with open(tmp_path, 'w', newline='') as csvfile:
+            if isinstance(transactions, TransactionBatch):
+                # Columnar batches write all their rows in one bulk call
+                writer = csv.writer(csvfile)
+                writer.writerow(fieldnames)
+                transactions.writerows(writer)
+            else:
+                writer = csv.DictWriter(csvfile, fieldnames=fieldnames, extrasaction='ignore')
                 
-        print(f"Successfully saved {len(transactions)} transactions to {output_path}")
-        return True
-    except Exception as e:
+                writer.writeheader()
+                for transaction in transactions:
+                    writer.writerow(transaction)
+        os.replace(tmp_path, output_path)
+    except BaseException as e:
+        # Never leave the partial file behind, whatever interrupted the write
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        if not isinstance(e, (OSError, csv.Error)):
+            raise
         print(f"Error saving to CSV: {e}")
         return False
+                
+    print(f"Successfully saved {len(transactions)} transactions to {output_path}")
+    return True
 
-def main():
+def main(argv=None, prog=None):
     """Main function to handle command-line arguments and process the PDF."""
-    parser = argparse.ArgumentParser(description='Convert TD credit card statement PDF to CSV')
-    parser.add_argument('pdf_path', help='Path to the PDF statement file')
+    parser = argparse.ArgumentParser(prog=prog, description='Convert TD credit card statement PDF to CSV')
+    parser.add_argument('pdf_path', help='Path to the PDF statement file (or page text dump with --from-dump)')
     parser.add_argument('--output', '-o', help='Output CSV file path')
     parser.add_argument('--verbose', '-v', action='store_true', help='Enable verbose output')
     parser.add_argument('--debug', '-d', action='store_true', help='Enable debug mode with additional output')
@@ -435,8 +693,34 @@ def main():
                        help='Analyze each page separately for additional transactions')
     parser.add_argument('--thorough', '-t', action='store_true',
                        help='Enable thorough processing to find more transactions')
+    parser.add_argument('--adaptive', '-a', action='store_true',
+                       help='Run thorough analysis only on pages that look misparsed, or when the balances do not add up')
+    parser.add_argument('--profile', action='store_true',
+                       help='Record per-stage timings and write them to <output>.profile.json')
+    parser.add_argument('--stream', '-s', action='store_true',
+                       help='Write each transaction as soon as it is parsed (document order, not sorted by date)')
+    parser.add_argument('--pages', metavar='RANGES',
+                       help='Only parse these pages, e.g. "1-3,5" (page 1 is still read for the statement header)')
+    parser.add_argument('--prefilter', action='store_true',
+                       help='Skip extracting pages that cannot hold transactions, such as disclosure pages')
+    parser.add_argument('--page-jobs', type=int, default=None, metavar='N',
+                       help='Extract the pages of the PDF in N worker processes (for very long statements)')
+    parser.add_argument('--from-dump', action='store_true',
+                       help='Read page text from a dump written by debug_pdf.py --dump instead of a PDF')
+    parser.add_argument('--layout', choices=['auto'] + sorted(PROFILES), default='auto',
+                       help='Statement layout profile (default: auto, detected from the first page)')
+    add_backend_arguments(parser)
+    add_cache_arguments(parser)
+    add_sink_arguments(parser)
+    
+    args = parser.parse_args(argv)
     
-    args = parser.parse_args()
+    pages = None
+    if args.pages:
+        try:
+            pages = parse_page_ranges(args.pages)
+        except ValueError as e:
+            parser.error(str(e))
     
     # Set up verbose mode
     verbose_mode = args.verbose or args.debug
@@ -444,16 +728,23 @@ def main():
         print("Debug mode enabled - showing detailed information")
     if args.thorough:
         print("Thorough processing mode enabled - will try harder to find all transactions")
+    thorough = args.thorough or args.page_analysis or (ADAPTIVE if args.adaptive else False)
     
     # Validate input file
     if not os.path.exists(args.pdf_path):
         print(f"Error: File '{args.pdf_path}' does not exist.")
         return 1
+    if args.from_dump:
+        try:
+            read_dump_header(args.pdf_path)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return 1
         
     # Generate default output path if not specified
     if not args.output:
         basename = os.path.basename(args.pdf_path)
-        filename, _ = os.path.splitext(basename)
+        filename = dump_stem(basename) if args.from_dump else os.path.splitext(basename)[0]
         args.output = os.path.join("out", f"{filename}.csv")
         
     # Create output directory if it doesn't exist
@@ -466,15 +757,56 @@ def main():
     if verbose_mode:
         print(f"File size: {os.path.getsize(args.pdf_path) / 1024:.2f} KB")
         
+    profiler = Profiler(args.pdf_path) if args.profile else None
+    
+    def write_profile():
+        if profiler:
+            report = profiler.report()
+            print_report(report)
+            profile_path = os.path.splitext(args.output)[0] + ".profile.json"
+            write_report(report, profile_path)
+            print(f"Profile saved to {profile_path}")
+    
+    # Stream transactions straight to the CSV file as pages are parsed
+    if args.stream and args.sink != 'csv':
+        print("Error: --stream only supports --sink csv.")
+        return 1
+    if args.stream:
+        transactions = iter_transactions(
+            pdf_path=args.pdf_path,
+            verbose=verbose_mode,
+            thorough=thorough,
+            cache=cache_from_args(args),
+            profiler=profiler,
+            pages=pages,
+            prefilter=args.prefilter,
+            page_jobs=args.page_jobs,
+            layout=args.layout,
+            from_dump=args.from_dump,
+            backend=args.backend
+        )
+        saved = save_to_csv(transactions, args.output, stream=True)
+        write_profile()
+        return 0 if saved else 1
+    
     # Extract transactions
     transactions = extract_transactions(
         pdf_path=args.pdf_path, 
         verbose=verbose_mode,
-        thorough=args.thorough or args.page_analysis
+        thorough=thorough,
+        cache=cache_from_args(args),
+        profiler=profiler,
+        pages=pages,
+        prefilter=args.prefilter,
+        page_jobs=args.page_jobs,
+        layout=args.layout,
+        from_dump=args.from_dump,
+        backend=args.backend
     )
     
     if not transactions:
         print("No transactions were found in the PDF.")
+        write_profile()
         return 1
         
     print(f"Found {len(transactions)} transactions.")
@@ -487,8 +819,14 @@ def main():
             for i, t in enumerate(transactions):
                 print(f"Transaction {i+1}: {t['transaction_date']} - {t['description']} - ${t['amount']:.2f}")
     
-    # Save to CSV
-    save_to_csv(transactions, args.output)
+    # Save to CSV and/or the SQLite database
+    if args.sink in ('csv', 'both'):
+        with (profiler or NULL_PROFILER).stage('save_csv'):
+            save_to_csv(transactions, args.output)
+    if args.sink in ('sqlite', 'both'):
+        with (profiler or NULL_PROFILER).stage('save_sqlite'):
+            save_to_sqlite(transactions, args.db, os.path.basename(args.pdf_path))
+    write_profile()
     
     return 0
 
@@ -1,59 +1,451 @@
 #!/usr/bin/env python3
 import os
+import io
 import glob
-import subprocess
+import time
 import argparse
+import contextlib
+from collections import Counter
 from datetime import datetime
 
-def process_all_pdfs(input_dir="in", output_dir="out", thorough=False, verbose=False):
-    """Process all PDF files in the input directory and save CSV files to the output directory."""
+from pdf_to_csv import ADAPTIVE, PARSER_VERSION, extract_transactions, save_to_csv
+from page_cache import add_cache_arguments, cache_from_args
+from extract_backends import DEFAULT_BACKEND, add_backend_arguments, get_backend
+from profiling import NULL_PROFILER, Profiler, aggregate_reports, print_report, write_report
+from sqlite_sink import DEFAULT_DB_PATH, add_sink_arguments, save_to_sqlite
+from page_dump import DUMP_SUFFIX, dump_stem
+from batch_limits import (DEFAULT_MAX_RSS_MB, DEFAULT_TIMEOUT, TimeLimitExceeded, can_limit, describe_error,
+                          failure_kind, quarantine, run_limited)
+from manifest import load_manifest, manifest_path, plan_incremental, record_conversion, save_manifest
+
+# Why a file failed (result['failure']) -> how the batch summary counts it
+FAILURE_LABELS = {
+    'timeout': 'timed out',
+    'memory': 'over the memory budget',
+    'crashed': 'crashed',
+    'error': 'failed with an error',
+    'empty': 'had no transactions',
+    'output': 'could not be saved',
+}
+# Failures retried once with the fallback settings, and those whose input is then quarantined
+RETRY_FAILURES = ('timeout', 'memory', 'crashed', 'error', 'empty')
+QUARANTINE_FAILURES = ('timeout', 'memory', 'crashed', 'error')
+
+# Exit codes of main: every file converted, some failed, some hit their time or memory budget
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_OVER_BUDGET = 3
+
+def convert_pdf(pdf_file, output_dir, thorough=False, verbose=False, cache=None, profile=False,
+                sink='csv', db_path=None, prefilter=False, from_dump=False, backend=None):
+    """Convert a single PDF to CSV in-process and return a result summary.
+
+    With ``profile``, the summary includes the file's per-stage timing report.
+    ``sink`` is 'csv', 'sqlite' or 'both'; SQLite output goes to ``db_path``.
+    ``prefilter`` skips pages that cannot hold transactions. With
+    ``from_dump``, pdf_file is a page text dump instead of a PDF. ``backend``
+    names the PDF text extraction backend. ``failure`` in the summary says
+    why a file failed (see FAILURE_LABELS). Running out of time or memory
+    is not caught here: it propagates to the worker running the file, which
+    must not be reused (see convert_files).
+    """
+    filename = dump_stem(pdf_file) if from_dump else os.path.splitext(os.path.basename(pdf_file))[0]
+    output_path = os.path.join(output_dir, f"{filename}.csv")
+    result = {
+        'file': pdf_file,
+        'output': None,
+        'rows': 0,
+        'duration': 0.0,
+        'error': None,
+        'failure': None,
+        'thorough': thorough,
+        'log': '',
+        'profile': None
+    }
+    profiler = Profiler(pdf_file) if profile else NULL_PROFILER
+
+    # Capture the converter's console output so parallel workers don't interleave
+    log = io.StringIO()
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(log):
+            transactions = extract_transactions(pdf_file, verbose=verbose, thorough=thorough, cache=cache,
+                                                profiler=profiler, prefilter=prefilter, from_dump=from_dump,
+                                                backend=backend)
+            result['rows'] = len(transactions)
+            if not transactions:
+                result['error'] = "No transactions found"
+                result['failure'] = 'empty'
+            else:
+                if sink in ('csv', 'both'):
+                    with profiler.stage('save_csv'):
+                        if save_to_csv(transactions, output_path):
+                            result['output'] = output_path
+                        else:
+                            result['error'] = f"Could not save {output_path}"
+                            result['failure'] = 'output'
+                if sink in ('sqlite', 'both') and not result['error']:
+                    with profiler.stage('save_sqlite'):
+                        if save_to_sqlite(transactions, db_path, os.path.basename(pdf_file)):
+                            result['output'] = result['output'] or db_path
+                        else:
+                            result['error'] = f"Could not save to {db_path}"
+                            result['failure'] = 'output'
+    except (TimeLimitExceeded, MemoryError):
+        raise
+    except Exception as e:
+        result['error'] = describe_error(e)
+        result['failure'] = 'error'
+    result['duration'] = time.perf_counter() - start
+    result['log'] = log.getvalue()
+    result['profile'] = profiler.report()
+
+    return result
+
+def failed_result(pdf_file, failure, error, duration=0.0):
+    """Result summary for a file whose worker died or was killed before returning one."""
+    return {'file': pdf_file, 'output': None, 'rows': 0, 'duration': duration, 'error': error,
+            'failure': failure, 'log': '', 'profile': None}
+
+def print_summary(results, duration=None):
+    """Print a per-file result table and totals for a batch run.
+
+    With the run's wall-clock ``duration``, throughput is printed as well.
+    Failures are counted by kind, along with the files retried and quarantined.
+    """
+    print("\nFile summary:")
+    for result in sorted(results, key=lambda r: r['file']):
+        status = "ok" if not result['error'] else f"ERROR: {result['error']}"
+        if result.get('retried'):
+            status += " (on retry with fallback settings)" if not result['error'] else " (retried)"
+        if result.get('quarantined'):
+            status += f" - quarantined to {result['quarantined']}"
+        print(f"  {os.path.basename(result['file'])}: {result['rows']} rows "
+              f"in {result['duration']:.2f}s - {status}")
+
+    failed = [r for r in results if r['error']]
+    total_rows = sum(r['rows'] for r in results)
+    print(f"Total: {total_rows} rows, {len(results) - len(failed)} succeeded, {len(failed)} failed.")
+    if duration:
+        print(f"Throughput: {len(results) / duration:.2f} files/sec, {total_rows / duration:.0f} rows/sec "
+              f"over {duration:.2f}s")
+    kinds = Counter(r.get('failure') or 'error' for r in failed)
+    if kinds:
+        print("Failures: " + ", ".join(f"{count} {FAILURE_LABELS.get(kind, kind)}"
+                                       for kind, count in kinds.items()))
+    retried = [r for r in results if r.get('retried')]
+    if retried:
+        recovered = sum(1 for r in retried if not r['error'])
+        print(f"Retried {len(retried)} files with fallback settings: {recovered} recovered.")
+    quarantined = sum(1 for r in results if r.get('quarantined'))
+    if quarantined:
+        print(f"Quarantined {quarantined} files.")
+
+def exit_code(results):
+    """Exit code for a batch run.
+
+    EXIT_OVER_BUDGET if a file ran out of time or memory, else EXIT_FAILED
+    if any file failed, else EXIT_OK. A statement where even thorough mode found no transactions may simply
+    have had none, so it doesn't count as a failure.
+    """
+    failures = {r.get('failure') or 'error' for r in results
+                if r['error'] and not (r.get('failure') == 'empty' and r.get('thorough') is True)}
+    if failures & {'timeout', 'memory'}:
+        return EXIT_OVER_BUDGET
+    return EXIT_FAILED if failures else EXIT_OK
+
+def conversion_options(thorough=False, sink='csv', prefilter=False, backend=None):
+    """The options recorded in the manifest, which decide whether an earlier conversion is still valid.
+
+    ``backend`` is the name of the extraction backend actually used; PyPDF2
+    is left out so manifests written before backends existed stay valid.
+    """
+    options = {'thorough': thorough}
+    if sink != 'csv':
+        options['sink'] = sink
+    if prefilter:
+        options['prefilter'] = True
+    if backend and backend != DEFAULT_BACKEND:
+        options['backend'] = backend
+    return options
+
+def fallback_settings(failure, thorough, prefilter, backend):
+    """``(thorough, prefilter, backend)`` for the one retry of a file that failed this way.
+
+    A statement with no transactions is retried in thorough mode. Any other
+    failure is retried the cheapest way: no thorough pass, with the page
+    prefilter and with PyPDF2.
+    """
+    if failure == 'empty':
+        return True, prefilter, backend
+    return False, True, DEFAULT_BACKEND if backend else backend
+
+def convert_files(pdf_files, settings, jobs, timeout=DEFAULT_TIMEOUT, max_rss_mb=DEFAULT_MAX_RSS_MB):
+    """Convert files with convert_pdf and yield each result as soon as it is ready.
+
+    ``settings`` are convert_pdf's arguments after ``pdf_file``. With a
+    ``timeout`` or ``max_rss_mb`` budget, files are converted by forked worker
+    processes that are stopped when a file goes over budget (see
+    batch_limits.run_limited). Without budgets, or where processes can't be forked and
+    limited, files are converted in-process (one job) or in a process pool.
+    """
+    if (timeout or max_rss_mb) and can_limit():
+        tasks = [(pdf_file, convert_pdf, (pdf_file,) + settings) for pdf_file in pdf_files]
+        for pdf_file, result, failure, seconds in run_limited(tasks, jobs, timeout, max_rss_mb):
+            yield result if failure is None else failed_result(pdf_file, *failure, seconds)
+        return
+    if timeout or max_rss_mb:
+        print("Warning: per-file time and memory budgets need fork and resource limits; "
+              "converting without them.")
+
+    if jobs == 1:
+        # No pool needed - avoids process startup cost for small runs
+        for pdf_file in pdf_files:
+            try:
+                result = convert_pdf(pdf_file, *settings)
+            except MemoryError as e:
+                result = failed_result(pdf_file, failure_kind(e), describe_error(e))
+            yield result
+        return
+
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(convert_pdf, pdf_file, *settings): pdf_file for pdf_file in pdf_files}
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except MemoryError as e:
+                yield failed_result(futures[future], failure_kind(e), describe_error(e))
+            except Exception as e:
+                # The worker itself died (e.g. killed); record it and carry on
+                yield failed_result(futures[future], 'crashed', describe_error(e))
+
+def process_all_pdfs(input_dir="in", output_dir="out", thorough=False, verbose=False, jobs=None, cache=None,
+                     incremental=False, profile=False, sink='csv', db_path=DEFAULT_DB_PATH, prefilter=False,
+                     from_dump=False, backend=None, timeout=DEFAULT_TIMEOUT, max_rss_mb=DEFAULT_MAX_RSS_MB,
+                     retry=True, quarantine_dir=None):
+    """Process all PDF files in the input directory and save CSV files to the output directory.
+
+    Files are spread over ``jobs`` worker processes (default: number of CPU
+    cores), see convert_files. Returns a list of per-file result
+    dicts with the rows found, duration and any error. Pass a PageTextCache as
+    ``cache`` to reuse page text extracted by earlier runs. With
+    ``incremental``, only inputs that are new or changed since the last run
+    (according to the manifest in the output directory) are converted. With
+    ``profile``, per-stage timings of every file and their aggregate are written
+    to profile.json in the output directory. ``sink`` selects CSV files,
+    the SQLite database at ``db_path``, or both. ``prefilter`` skips
+    extracting pages that cannot hold transactions. With ``from_dump``, the
+    page text dumps (*.pages.jsonl.gz, see debug_pdf.py --dump) in input_dir
+    are parsed instead of the PDF files. ``backend`` names the PDF text
+    extraction backend (default: the calibrated choice, or PyPDF2).
+
+    Each file gets ``timeout`` seconds and ``max_rss_mb`` of memory (0 for no
+    limit); a file that goes over is stopped without holding up the rest of
+    the batch. With ``retry``, failed files are converted once more with
+    fallback_settings, unless those are the settings that already failed.
+    Files that still fail with an error, a timeout, too much memory or a
+    crashed worker are moved to ``quarantine_dir``, if given, with a
+    <name>.reason.json record of their attempts; a file already in
+    quarantine under the same name is never overwritten. Files that only
+    converted on the retry are recorded in the manifest with the fallback
+    settings.
+    """
     # Ensure output directory exists
     os.makedirs(output_dir, exist_ok=True)
-    
-    # Get all PDF files in the input directory
-    pdf_files = sorted(glob.glob(os.path.join(input_dir, "*.pdf")))
-    
+
+    # Get all PDF files (or page text dumps) in the input directory
+    pdf_files = sorted(glob.glob(os.path.join(input_dir, "*" + DUMP_SUFFIX if from_dump else "*.pdf")))
+
     if not pdf_files:
-        print(f"No PDF files found in {input_dir} directory.")
-        return
-    
-    print(f"Found {len(pdf_files)} PDF files to process.")
+        print(f"No {'page text dumps' if from_dump else 'PDF files'} found in {input_dir} directory.")
+        return []
+
+    # Resolved once, so every worker uses the same backend and the manifest records it
+    backend = None if from_dump else get_backend(backend).name
+    options = conversion_options(thorough, sink, prefilter, backend)
+    manifest = load_manifest(manifest_path(output_dir))
+    if incremental:
+        to_convert, unchanged, stale = plan_incremental(pdf_files, manifest, PARSER_VERSION, options)
+        for entry in stale:
+            if os.path.exists(entry['output']):
+                print(f"Stale output: {entry['output']} (input {entry['input']} no longer exists)")
+            else:
+                del manifest['files'][os.path.basename(entry['input'])]
+        if unchanged:
+            print(f"Skipping {len(unchanged)} unchanged PDF files.")
+        pdf_files = sorted(to_convert)
+        if not pdf_files:
+            save_manifest(manifest, manifest_path(output_dir))
+            print("All PDF files are up to date.")
+            return []
+
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(pdf_files)))
+    print(f"Found {len(pdf_files)} PDF files to process using {jobs} worker(s).")
     start_time = datetime.now()
-    
-    # Process each PDF file
-    for i, pdf_file in enumerate(pdf_files, 1):
-        filename = os.path.basename(pdf_file)
-        print(f"[{i}/{len(pdf_files)}] Processing {filename}...")
-        
-        # Build command arguments
-        cmd = ["python", "pdf_to_csv.py", pdf_file]
+
+    if (timeout or max_rss_mb) and can_limit() and not from_dump:
+        # Loaded once here, so every forked worker inherits it instead of importing it again
+        get_backend(backend).preload()
+
+    def settings(thorough, prefilter, backend):
+        return (output_dir, thorough, verbose, cache, profile, sink, db_path, prefilter, from_dump, backend)
+
+    def report(i, count, result):
+        filename = os.path.basename(result['file'])
         if verbose:
-            cmd.append("-v")
-        if thorough:
-            cmd.append("-t")
-        
-        # Run the pdf_to_csv.py script
-        subprocess.run(cmd)
-    
+            print(result['log'], end='')
+        status = f"{result['rows']} rows" if not result['error'] else f"ERROR: {result['error']}"
+        print(f"[{i}/{count}] {filename}: {status} ({result['duration']:.2f}s)")
+
+    results = {}
+    for i, result in enumerate(convert_files(pdf_files, settings(thorough, prefilter, backend), jobs,
+                                             timeout, max_rss_mb), 1):
+        results[result['file']] = result
+        report(i, len(pdf_files), result)
+
+    # Retry failed files once, grouped by the fallback settings their failure calls for
+    retries = {}
+    for result in results.values() if retry else ():
+        if result['failure'] in RETRY_FAILURES:
+            fallback = fallback_settings(result['failure'], thorough, prefilter, backend)
+            # The same settings would only spend the file's budget again
+            if fallback != (thorough, prefilter, backend):
+                retries.setdefault(fallback, []).append(result['file'])
+    for fallback, files in retries.items():
+        fallback_options = conversion_options(fallback[0], sink, fallback[1], fallback[2])
+        print(f"Retrying {len(files)} failed files with {fallback_options}...")
+        for i, result in enumerate(convert_files(files, settings(*fallback), min(jobs, len(files)),
+                                                 timeout, max_rss_mb), 1):
+            first = results[result['file']]
+            result['retried'] = True
+            result['attempts'] = [
+                {'options': options, 'failure': first['failure'], 'error': first['error'],
+                 'duration': first['duration']},
+                {'options': fallback_options, 'failure': result['failure'], 'error': result['error'],
+                 'duration': result['duration']},
+            ]
+            results[result['file']] = result
+            report(i, len(files), result)
+    results = [results[pdf_file] for pdf_file in pdf_files]
+
+    for result in results:
+        if result['output']:
+            # A file that only converted on the retry is recorded with the settings that worked
+            used = result['attempts'][-1]['options'] if result.get('retried') else options
+            record_conversion(manifest, result['file'], PARSER_VERSION, used, result,
+                              to_convert.get(result['file']) if incremental else None)
+    save_manifest(manifest, manifest_path(output_dir))
+
+    for result in results:
+        if quarantine_dir and result['failure'] in QUARANTINE_FAILURES and os.path.exists(result['file']):
+            attempts = result.get('attempts') or [{'options': options, 'failure': result['failure'],
+                                                   'error': result['error'], 'duration': result['duration']}]
+            record = {'failure': result['failure'], 'error': result['error'],
+                      'parser_version': PARSER_VERSION, 'attempts': attempts}
+            try:
+                result['quarantined'] = quarantine(result['file'], quarantine_dir, record)
+            except FileExistsError as e:
+                print(f"Not quarantining {result['file']}: {e}")
+
     end_time = datetime.now()
     duration = (end_time - start_time).total_seconds()
+    print_summary(results, duration)
+    if profile:
+        reports = [result['profile'] for result in results if result['profile']]
+        batch_report = aggregate_reports(reports)
+        print_report(batch_report)
+        profile_path = os.path.join(output_dir, "profile.json")
+        write_report({'batch': batch_report, 'files': reports}, profile_path)
+        print(f"Profile saved to {profile_path}")
     print(f"\nCompleted processing {len(pdf_files)} PDF files in {duration:.2f} seconds.")
 
-def main():
-    parser = argparse.ArgumentParser(description='Process all PDF files in the input directory.')
+    return results
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Process all PDF files in the input directory.')
     parser.add_argument('--input', '-i', default='in', help='Input directory containing PDF files')
     parser.add_argument('--output', '-o', default='out', help='Output directory for CSV files')
     parser.add_argument('--verbose', '-v', action='store_true', help='Enable verbose output')
     parser.add_argument('--thorough', '-t', action='store_true', help='Enable thorough processing')
-    
-    args = parser.parse_args()
-    
-    process_all_pdfs(
+    parser.add_argument('--adaptive', '-a', action='store_true',
+                        help='Run thorough analysis only on pages that look misparsed')
+    parser.add_argument('--jobs', '-j', type=int, default=None,
+                        help='Number of worker processes (default: number of CPU cores)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only convert PDF files that are new or changed since the last run')
+    parser.add_argument('--profile', action='store_true',
+                        help='Record per-stage timings for every file and write them to <output>/profile.json')
+    parser.add_argument('--prefilter', action='store_true',
+                        help='Skip extracting pages that cannot hold transactions, such as disclosure pages')
+    parser.add_argument('--from-dump', action='store_true',
+                        help='Parse the page text dumps (*.pages.jsonl.gz) in the input directory instead of PDFs')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT, metavar='SECONDS',
+                        help=f'Stop converting a file after this long '
+                             f'(default: {DEFAULT_TIMEOUT}, 0 for no limit)')
+    parser.add_argument('--max-rss', type=int, default=DEFAULT_MAX_RSS_MB, metavar='MB',
+                        help=f'Stop converting a file that uses more memory than this '
+                             f'(default: {DEFAULT_MAX_RSS_MB}, 0 for no limit)')
+    parser.add_argument('--no-retry', action='store_true',
+                        help='Do not retry failed files with fallback settings')
+    parser.add_argument('--quarantine', metavar='DIR',
+                        help='Move files that still fail after the retry to DIR with a reason record')
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep running and convert PDFs as they arrive in the input directory')
+    parser.add_argument('--settle', type=float, default=2.0, metavar='SECONDS',
+                        help='With --watch, how long a file must stay unchanged before it is converted (default: 2)')
+    parser.add_argument('--poll', action='store_true',
+                        help='With --watch, poll the input directory instead of using inotify')
+    parser.add_argument('--dedupe', choices=['off', 'flag', 'drop'], default='flag',
+                        help='With --watch, flag (default) or drop transactions that overlapping '
+                             'statements repeat in combined.csv')
+    add_backend_arguments(parser)
+    add_cache_arguments(parser)
+    add_sink_arguments(parser)
+
+    args = parser.parse_args(argv)
+    thorough = args.thorough or (ADAPTIVE if args.adaptive else False)
+
+    if args.watch:
+        from watch_folder import watch
+        watch(
+            input_dir=args.input,
+            output_dir=args.output,
+            verbose=args.verbose,
+            thorough=thorough,
+            jobs=args.jobs,
+            cache=cache_from_args(args),
+            sink=args.sink,
+            db_path=args.db,
+            prefilter=args.prefilter,
+            backend=args.backend,
+            settle=args.settle,
+            use_inotify=not args.poll,
+            dedupe=None if args.dedupe == 'off' else args.dedupe
+        )
+        return EXIT_OK
+
+    results = process_all_pdfs(
         input_dir=args.input,
         output_dir=args.output,
         verbose=args.verbose,
-        thorough=args.thorough
+        thorough=thorough,
+        jobs=args.jobs,
+        cache=cache_from_args(args),
+        incremental=args.incremental,
+        profile=args.profile,
+        sink=args.sink,
+        db_path=args.db,
+        prefilter=args.prefilter,
+        from_dump=args.from_dump,
+        backend=args.backend,
+        timeout=args.timeout,
+        max_rss_mb=args.max_rss,
+        retry=not args.no_retry,
+        quarantine_dir=args.quarantine
     )
+    return exit_code(results)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    exit(main())
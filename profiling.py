@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+import json
+import time
+from contextlib import contextmanager, nullcontext
+
+# Stages in the order they happen, used to order reports
+STAGES = ['pdf_open', 'cache_lookup', 'prefilter', 'extract_text', 'layout_detection', 'header_detection',
+          'main_pass', 'anomaly_check', 'thorough_pass', 'parse_date', 'sort', 'save_csv', 'save_sqlite']
+
+SLOWEST_COUNT = 5
+
+class Profiler:
+    """Collect wall time and call counts per conversion stage, plus per-page timings.
+
+    Stages can nest: parse_date time is also counted in the main and thorough
+    pass that called it.
+    """
+
+    enabled = True
+
+    def __init__(self, name=None):
+        self.name = name
+        self.stages = {}
+        self.pages = {}
+        self._start = time.perf_counter()
+
+    def add(self, stage, seconds, calls=1, page_num=None):
+        """Add time to a stage, and to a page if the work was for one page."""
+        totals = self.stages.setdefault(stage, {'seconds': 0.0, 'calls': 0})
+        totals['seconds'] += seconds
+        totals['calls'] += calls
+        if page_num is not None:
+            page = self.pages.setdefault(page_num, {})
+            page[stage] = page.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, stage, page_num=None):
+        """Time the enclosed block as one call of a stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start, page_num=page_num)
+
+    def wrap(self, stage, func):
+        """Return func wrapped so every call is timed as the given stage."""
+        perf_counter = time.perf_counter
+        add = self.add
+
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                add(stage, perf_counter() - start)
+        return timed
+
+    def report(self):
+        """Return the profile as a JSON-serializable dict."""
+        order = {stage: idx for idx, stage in enumerate(STAGES)}
+        stages = {stage: {'seconds': round(totals['seconds'], 6), 'calls': totals['calls']}
+                  for stage, totals in sorted(self.stages.items(),
+                                              key=lambda item: order.get(item[0], len(order)))}
+        pages = [{'file': self.name, 'page': page_num + 1,
+                  'seconds': round(sum(times.values()), 6),
+                  'stages': {stage: round(seconds, 6) for stage, seconds in times.items()}}
+                 for page_num, times in self.pages.items()]
+        pages.sort(key=lambda page: page['seconds'], reverse=True)
+        return {
+            'file': self.name,
+            'total_seconds': round(time.perf_counter() - self._start, 6),
+            'page_count': len(self.pages),
+            'stages': stages,
+            'slowest_pages': pages[:SLOWEST_COUNT]
+        }
+
+class NullProfiler:
+    """Profiler stand-in that records nothing, so unprofiled runs pay no timing cost."""
+
+    enabled = False
+    _null = nullcontext()
+
+    def add(self, stage, seconds, calls=1, page_num=None):
+        pass
+
+    def stage(self, stage, page_num=None):
+        return self._null
+
+    def wrap(self, stage, func):
+        return func
+
+    def report(self):
+        return None
+
+NULL_PROFILER = NullProfiler()
+
+def aggregate_reports(reports):
+    """Combine per-file profile reports into a batch report with the slowest files and pages."""
+    stages = {}
+    pages = []
+    for report in reports:
+        for stage, totals in report['stages'].items():
+            combined = stages.setdefault(stage, {'seconds': 0.0, 'calls': 0})
+            combined['seconds'] += totals['seconds']
+            combined['calls'] += totals['calls']
+        pages.extend(report['slowest_pages'])
+
+    order = {stage: idx for idx, stage in enumerate(STAGES)}
+    slowest_files = sorted(reports, key=lambda report: report['total_seconds'], reverse=True)
+    return {
+        'files': len(reports),
+        'total_seconds': round(sum(report['total_seconds'] for report in reports), 6),
+        'stages': {stage: {'seconds': round(totals['seconds'], 6), 'calls': totals['calls']}
+                   for stage, totals in sorted(stages.items(),
+                                               key=lambda item: order.get(item[0], len(order)))},
+        'slowest_files': [{'file': report['file'], 'seconds': report['total_seconds'],
+                           'slowest_stage': max(report['stages'], key=lambda s: report['stages'][s]['seconds'],
+                                                default=None)}
+                          for report in slowest_files[:SLOWEST_COUNT]],
+        'slowest_pages': sorted(pages, key=lambda page: page['seconds'], reverse=True)[:SLOWEST_COUNT]
+    }
+
+def print_report(report):
+    """Print a short human-readable summary of a file or batch profile."""
+    print(f"\nProfile ({report['total_seconds']:.3f}s):")
+    for stage, totals in report['stages'].items():
+        print(f"  {stage:<17} {totals['seconds']:>9.4f}s  {totals['calls']:>7} calls")
+    for entry in report.get('slowest_files', []):
+        print(f"  slow file: {entry['file']} {entry['seconds']:.3f}s (mostly {entry['slowest_stage']})")
+    for page in report['slowest_pages']:
+        print(f"  slow page: {page['file']} page {page['page']} {page['seconds']:.4f}s")
+
+def write_report(report, path):
+    """Write a profile report as JSON."""
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
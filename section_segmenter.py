@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+import re
+
+class SectionSegmenter:
+    """Split page text into non-overlapping sections at known section headers.
+
+    All headers are found in one scan with a single alternation. Longer
+    headers are tried first and matches must be whole words, so "TRANSACTIONS"
+    is not also found inside "YOUR TRANSACTIONS".
+    """
+
+    def __init__(self, section_headers):
+        # section_headers maps each header text to its section type
+        self.section_headers = dict(section_headers)
+        headers = sorted(self.section_headers, key=len, reverse=True)
+        self._regex = re.compile(r'\b(?:' + '|'.join(re.escape(header) for header in headers) + r')\b')
+
+    def find_headers(self, text):
+        """Return ``(start, end, header, section_type)`` for every header in text, in order."""
+        return [(match.start(), match.end(), match.group(0), self.section_headers[match.group(0)])
+                for match in self._regex.finditer(text)]
+
+    def segment(self, text, headers=None):
+        """Cut text into ``(section_type, header, section_text)`` sections.
+
+        Each section runs from the end of its header to the start of the next
+        one; text before the first header is left out. If there are no headers
+        the whole text is returned as one section with type and header None.
+        ``headers`` may be passed in if find_headers has already been run.
+        """
+        if headers is None:
+            headers = self.find_headers(text)
+        if not headers:
+            return [(None, None, text)]
+
+        sections = []
+        for idx, (_, end, header, section_type) in enumerate(headers):
+            next_start = headers[idx + 1][0] if idx + 1 < len(headers) else len(text)
+            sections.append((section_type, header, text[end:next_start]))
+        return sections
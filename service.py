@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""Local HTTP service that converts uploaded statement PDFs.
+
+POST the PDF as the request body to /convert and the transactions come back
+as CSV (default) or JSON (?format=json). Parsing runs in a pool of warm
+worker processes, so a request only pays for the parsing itself; a worker
+that runs past the request timeout is killed and replaced. GET /health
+and GET /metrics report the service state. Standard library only:
+
+    python service.py --port 8765
+    curl --data-binary @in/statement.pdf http://127.0.0.1:8765/convert?format=json
+"""
+import io
+import os
+import csv
+import json
+import time
+import signal
+import asyncio
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from transaction import FIELDNAMES
+
+DEFAULT_PORT = 8765
+DEFAULT_TIMEOUT = 60
+DEFAULT_MAX_QUEUE = 32
+DEFAULT_MAX_UPLOAD_MB = 50
+# Latencies kept for the p50/p99 in /metrics
+LATENCY_WINDOW = 1000
+# Rows per chunk when streaming a response
+ROWS_PER_CHUNK = 200
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           411: 'Length Required', 413: 'Payload Too Large', 422: 'Unprocessable Entity',
+           500: 'Internal Server Error', 503: 'Service Unavailable', 504: 'Gateway Timeout'}
+
+def _warm_worker():
+    """Worker initializer: import the parser and the PDF library once per worker, not per request."""
+    import pdf_to_csv  # noqa: F401
+    from extract_backends import get_backend
+    get_backend().preload()
+
+def convert_upload(data, thorough=False, prefilter=False):
+    """Worker entry point: parse one uploaded PDF and return its transactions."""
+    from pdf_to_csv import extract_transactions
+    return extract_transactions(data, thorough=thorough, prefilter=prefilter, quiet=True)
+
+def exchange(worker, data, thorough, prefilter):
+    """Send an upload to a worker and wait for its ``(result, failure)`` reply.
+
+    Blocks on the worker's pipe, so it runs in a thread rather than in the
+    event loop; killing the worker makes it return with EOFError.
+    """
+    worker.assign(None, convert_upload, (data, thorough, prefilter))
+    return worker.conn.recv()
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers, or None if it is empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+class HttpError(Exception):
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+class ConversionService:
+    """Accept conversions over HTTP and run them in a bounded pool of worker processes.
+
+    At most ``jobs`` conversions run at once and at most ``max_queue`` more
+    wait for a worker; beyond that requests are rejected with 503 and a
+    Retry-After header, so a burst can't pile up unbounded work. A request
+    that takes longer than ``timeout`` seconds (queueing included) gets a 504
+    and its worker is killed, so the slot is free again right away. Killed,
+    crashed or failed workers are replaced with fresh ones.
+    """
+
+    def __init__(self, jobs=None, max_queue=DEFAULT_MAX_QUEUE, timeout=DEFAULT_TIMEOUT,
+                 max_upload_bytes=DEFAULT_MAX_UPLOAD_MB * 1024 * 1024):
+        self.jobs = jobs or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.max_upload_bytes = max_upload_bytes
+        self.context = None
+        self.workers = []
+        self.threads = None
+        self.slots = None
+        self.started = time.time()
+        self.waiting = 0
+        self.running = 0
+        self.counts = {'completed': 0, 'failed': 0, 'rejected': 0, 'timed_out': 0}
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def start_pool(self):
+        import multiprocessing
+        # Workers are forked from a fork server rather than from this process, so a
+        # replacement worker never inherits (and keeps open) a client's socket
+        self.context = multiprocessing.get_context('forkserver')
+        self.context.set_forkserver_preload(['pdf_to_csv'])
+        self.workers = [self.start_worker() for _ in range(self.jobs)]
+        # One thread per slot talks to its worker, so pipe transfers never block the event loop
+        self.threads = ThreadPoolExecutor(max_workers=self.jobs)
+        self.slots = asyncio.Semaphore(self.jobs)
+
+    def start_worker(self):
+        """Fork a warm worker; returns None if the process can't be started or the service is stopping."""
+        from batch_limits import Worker
+        if self.context is None:
+            return None
+        try:
+            return Worker(self.context, 0, 0, _warm_worker)
+        except OSError as e:
+            print(f"Could not start a worker: {e}")
+            return None
+
+    def shutdown(self):
+        self.context = None
+        for worker in self.workers:
+            if worker is not None:
+                worker.stop()
+        self.workers = []
+        if self.threads is not None:
+            self.threads.shutdown(wait=False)
+
+    def metrics(self):
+        latencies = list(self.latencies)
+        p50 = percentile(latencies, 0.50)
+        p99 = percentile(latencies, 0.99)
+        return {
+            'uptime_seconds': round(time.time() - self.started, 1),
+            'workers': self.jobs,
+            'queue_depth': self.waiting,
+            'in_flight': self.running,
+            'max_queue': self.max_queue,
+            **self.counts,
+            'latency_ms': {
+                'samples': len(latencies),
+                'p50': None if p50 is None else round(p50 * 1000, 1),
+                'p99': None if p99 is None else round(p99 * 1000, 1),
+            },
+        }
+
+    async def convert(self, data, thorough, prefilter):
+        """Run one conversion in the pool, queueing for a free worker slot."""
+        if self.waiting + self.running >= self.jobs + self.max_queue:
+            self.counts['rejected'] += 1
+            raise HttpError(503, "Too many conversions queued, try again later", {'Retry-After': '1'})
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self.slots.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            self.counts['timed_out'] += 1
+            raise HttpError(504, f"No worker became free within {self.timeout}s")
+        finally:
+            self.waiting -= 1
+
+        self.running += 1
+        # Holding the slot guarantees a worker entry is free
+        worker = self.workers.pop()
+        reusable = False
+        reply = None
+        try:
+            if worker is None or not worker.process.is_alive():
+                if worker is not None:
+                    worker.stop()
+                worker = self.start_worker()
+                if worker is None:
+                    self.counts['failed'] += 1
+                    raise HttpError(503, "No conversion worker available, try again later", {'Retry-After': '1'})
+            reply = loop.run_in_executor(self.threads, exchange, worker, data, thorough, prefilter)
+            # asyncio.wait, unlike wait_for, leaves the reply running when time is up
+            await asyncio.wait({reply}, timeout=max(0.0, deadline - loop.time()))
+            if not reply.done():
+                self.counts['timed_out'] += 1
+                raise HttpError(504, f"Conversion did not finish within {self.timeout}s")
+            try:
+                result, failure = reply.result()
+            except (EOFError, OSError):
+                self.counts['failed'] += 1
+                raise HttpError(500, "Conversion worker died")
+            worker.finish()
+            if failure is None:
+                reusable = True
+                return result
+            self.counts['failed'] += 1
+            kind, message = failure
+            if kind == 'error':
+                raise HttpError(422, f"Could not convert PDF: {message}")
+            raise HttpError(500, f"Conversion failed: {message}")
+        finally:
+            if not reusable and worker is not None:
+                # Timed out, died, cancelled or left in an unknown state by a failure
+                worker.process.kill()
+                if reply is not None and not reply.done():
+                    # The thread waiting on the pipe gets EOF now that the worker is gone
+                    await asyncio.wait({reply})
+                    reply.exception()
+                worker.stop()
+                worker = self.start_worker()
+            self.workers.append(worker)
+            self.running -= 1
+            self.slots.release()
+
+    async def handle(self, reader, writer):
+        """Serve one HTTP request per connection."""
+        start = time.perf_counter()
+        method, path, status = '-', '-', 500
+        try:
+            try:
+                method, target, headers = await read_request_head(reader)
+                url = urlsplit(target)
+                path = url.path
+                status = await self.route(method, url, headers, reader, writer, start)
+            except HttpError as e:
+                status = e.status
+                await send_json(writer, e.status, {'error': str(e)}, e.headers)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                return
+            except Exception as e:
+                status = 500
+                await send_json(writer, 500, {'error': f"{type(e).__name__}: {e}"})
+        finally:
+            print(f"{method} {path} {status} {(time.perf_counter() - start) * 1000:.1f}ms")
+            writer.close()
+
+    async def route(self, method, url, headers, reader, writer, start):
+        if url.path == '/health':
+            await send_json(writer, 200, {'status': 'ok', 'workers': self.jobs})
+            return 200
+        if url.path == '/metrics':
+            await send_json(writer, 200, self.metrics())
+            return 200
+        if url.path != '/convert':
+            raise HttpError(404, f"Unknown path {url.path}")
+        if method != 'POST':
+            raise HttpError(405, "Use POST to upload a PDF", {'Allow': 'POST'})
+
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        output_format = params.get('format', 'csv')
+        if output_format not in ('csv', 'json'):
+            raise HttpError(400, "format must be csv or json")
+        thorough = params.get('thorough', '')
+        # 'auto' is pdf_to_csv.ADAPTIVE, not imported here to keep the parser out of this process
+        thorough = 'auto' if thorough == 'auto' else thorough in ('1', 'true', 'yes')
+        prefilter = params.get('prefilter', '') in ('1', 'true', 'yes')
+
+        if 'content-length' not in headers:
+            raise HttpError(411, "Content-Length is required")
+        try:
+            length = int(headers['content-length'])
+        except ValueError:
+            raise HttpError(400, "Invalid Content-Length")
+        if length > self.max_upload_bytes:
+            raise HttpError(413, f"Upload exceeds {self.max_upload_bytes // (1024 * 1024)} MB")
+        data = await reader.readexactly(length)
+        if not data:
+            raise HttpError(400, "Empty upload")
+
+        transactions = await self.convert(data, thorough, prefilter)
+        self.counts['completed'] += 1
+        self.latencies.append(time.perf_counter() - start)
+        if output_format == 'json':
+            await stream_json(writer, transactions)
+        else:
+            await stream_csv(writer, transactions)
+        return 200
+
+async def read_request_head(reader):
+    """Read the request line and headers; returns (method, target, lower-cased headers)."""
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except asyncio.LimitOverrunError:
+        raise HttpError(400, "Request headers too large")
+    lines = head.decode('latin-1').split('\r\n')
+    try:
+        method, target, _ = lines[0].split(' ', 2)
+    except ValueError:
+        raise HttpError(400, "Malformed request line")
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+    return method.upper(), target, headers
+
+def _head(status, headers):
+    lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}", "Connection: close"]
+    lines.extend(f"{name}: {value}" for name, value in headers.items())
+    return ("\r\n".join(lines) + "\r\n\r\n").encode('latin-1')
+
+async def send_json(writer, status, payload, headers=None):
+    body = json.dumps(payload).encode('utf-8')
+    writer.write(_head(status, {'Content-Type': 'application/json', 'Content-Length': len(body),
+                                **(headers or {})}))
+    writer.write(body)
+    await writer.drain()
+
+async def _send_chunk(writer, data):
+    if data:
+        writer.write(b"%x\r\n" % len(data) + data + b"\r\n")
+        await writer.drain()
+
+async def stream_csv(writer, transactions):
+    """Send transactions as a chunked CSV response with the same columns as save_to_csv."""
+    writer.write(_head(200, {'Content-Type': 'text/csv; charset=utf-8', 'Transfer-Encoding': 'chunked'}))
+    buffer = io.StringIO()
+    rows = csv.DictWriter(buffer, fieldnames=FIELDNAMES, extrasaction='ignore')
+    rows.writeheader()
+    for idx, transaction in enumerate(transactions, 1):
+        rows.writerow(transaction)
+        if idx % ROWS_PER_CHUNK == 0:
+            await _send_chunk(writer, buffer.getvalue().encode('utf-8'))
+            buffer.seek(0)
+            buffer.truncate()
+    await _send_chunk(writer, buffer.getvalue().encode('utf-8'))
+    writer.write(b"0\r\n\r\n")
+    await writer.drain()
+
+async def stream_json(writer, transactions):
+    """Send transactions as a chunked JSON array."""
+    writer.write(_head(200, {'Content-Type': 'application/json', 'Transfer-Encoding': 'chunked'}))
+    parts = ['[']
+    for idx, transaction in enumerate(transactions):
+        parts.append((',' if idx else '') + json.dumps(transaction))
+        if len(parts) >= ROWS_PER_CHUNK:
+            await _send_chunk(writer, ''.join(parts).encode('utf-8'))
+            parts = []
+    parts.append(']')
+    await _send_chunk(writer, ''.join(parts).encode('utf-8'))
+    writer.write(b"0\r\n\r\n")
+    await writer.drain()
+
+async def serve(host='127.0.0.1', port=DEFAULT_PORT, **options):
+    """Run the service until interrupted."""
+    service = ConversionService(**options)
+    service.start_pool()
+    server = await asyncio.start_server(service.handle, host, port)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    print(f"Serving on http://{host}:{port} with {service.jobs} worker(s)")
+    try:
+        async with server:
+            await stop.wait()
+    finally:
+        service.shutdown()
+    print("Service stopped.")
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Serve statement conversions over HTTP')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'Port (default: {DEFAULT_PORT})')
+    parser.add_argument('--jobs', '-j', type=int, default=None,
+                        help='Worker processes (default: number of CPU cores)')
+    parser.add_argument('--max-queue', type=int, default=DEFAULT_MAX_QUEUE,
+                        help=f'Conversions allowed to wait for a worker before rejecting (default: {DEFAULT_MAX_QUEUE})')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                        help=f'Seconds a request may take, queueing included (default: {DEFAULT_TIMEOUT})')
+    parser.add_argument('--max-upload-mb', type=int, default=DEFAULT_MAX_UPLOAD_MB,
+                        help=f'Largest accepted upload in MB (default: {DEFAULT_MAX_UPLOAD_MB})')
+    args = parser.parse_args(argv)
+
+    asyncio.run(serve(args.host, args.port, jobs=args.jobs, max_queue=args.max_queue, timeout=args.timeout,
+                      max_upload_bytes=args.max_upload_mb * 1024 * 1024))
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
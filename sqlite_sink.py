@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+import os
+import time
+
+from transaction import Transaction
+
+DEFAULT_DB_PATH = os.path.join("out", "transactions.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS statements (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL UNIQUE,
+    load_id INTEGER NOT NULL DEFAULT 0,
+    loaded_at REAL NOT NULL,
+    rows INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    statement_id INTEGER NOT NULL REFERENCES statements (id),
+    transaction_date TEXT NOT NULL,
+    posting_date TEXT NOT NULL,
+    description TEXT NOT NULL,
+    amount_cents INTEGER NOT NULL,
+    occurrence INTEGER NOT NULL,
+    foreign_amount REAL,
+    foreign_currency TEXT,
+    exchange_rate REAL,
+    section TEXT,
+    load_id INTEGER NOT NULL,
+    UNIQUE (statement_id, transaction_date, posting_date, description, amount_cents, occurrence)
+);
+CREATE INDEX IF NOT EXISTS transactions_date ON transactions (transaction_date);
+CREATE INDEX IF NOT EXISTS transactions_amount ON transactions (amount_cents);
+CREATE INDEX IF NOT EXISTS transactions_description ON transactions (description);
+"""
+
+UPSERT = """
+INSERT INTO transactions (statement_id, transaction_date, posting_date, description, amount_cents,
+                          occurrence, foreign_amount, foreign_currency, exchange_rate, section, load_id)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (statement_id, transaction_date, posting_date, description, amount_cents, occurrence)
+DO UPDATE SET foreign_amount = excluded.foreign_amount,
+              foreign_currency = excluded.foreign_currency,
+              exchange_rate = excluded.exchange_rate,
+              section = excluded.section,
+              load_id = excluded.load_id
+"""
+
+def connect(db_path=DEFAULT_DB_PATH):
+    """Open (creating if needed) the transactions database."""
+    import sqlite3
+    
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=60)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+def _rows(transactions, statement_id, load_id):
+    """Turn transactions into upsert parameter rows, numbering identical transactions apart."""
+    seen = {}
+    for transaction in transactions:
+        if not isinstance(transaction, Transaction):
+            transaction = Transaction.from_dict(transaction)
+        key = (transaction.transaction_date, transaction.posting_date, transaction.description,
+               transaction.amount_cents)
+        occurrence = seen.get(key, 0)
+        seen[key] = occurrence + 1
+        yield (statement_id, transaction.transaction_date, transaction.posting_date, transaction.description,
+               transaction.amount_cents, occurrence, transaction.foreign_amount, transaction.foreign_currency,
+               transaction.exchange_rate, transaction.section, load_id)
+
+def save_to_sqlite(transactions, db_path, source):
+    """Bulk-load one statement's transactions into the SQLite database.
+
+    ``source`` identifies the statement (normally the PDF file name). Rows are
+    upserted on their natural key (statement, dates, description, amount in
+    cents and occurrence number), and rows a previous load of the same
+    statement produced but this one did not are deleted, so re-processing a
+    statement replaces its rows instead of duplicating them. The whole
+    statement is written in a single database transaction.
+    """
+    import sqlite3
+    
+    if not transactions:
+        print("No transactions found to save.")
+        return False
+
+    try:
+        conn = connect(db_path)
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT INTO statements (source, load_id, loaded_at, rows) VALUES (?, 1, ?, 0) "
+                    "ON CONFLICT (source) DO UPDATE SET load_id = load_id + 1, loaded_at = excluded.loaded_at",
+                    (source, time.time()))
+                statement_id, load_id = conn.execute(
+                    "SELECT id, load_id FROM statements WHERE source = ?", (source,)).fetchone()
+                conn.executemany(UPSERT, _rows(transactions, statement_id, load_id))
+                conn.execute("DELETE FROM transactions WHERE statement_id = ? AND load_id != ?",
+                             (statement_id, load_id))
+                (rows,) = conn.execute("SELECT COUNT(*) FROM transactions WHERE statement_id = ?",
+                                       (statement_id,)).fetchone()
+                conn.execute("UPDATE statements SET rows = ? WHERE id = ?", (rows, statement_id))
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"Error saving to SQLite: {e}")
+        return False
+
+    print(f"Successfully saved {rows} transactions to {db_path} (statement {source})")
+    return True
+
+def add_sink_arguments(parser):
+    """Add the shared --sink/--db options to an argument parser."""
+    parser.add_argument('--sink', choices=['csv', 'sqlite', 'both'], default='csv',
+                        help='Where to write transactions (default: csv)')
+    parser.add_argument('--db', default=DEFAULT_DB_PATH,
+                        help=f'SQLite database path for --sink sqlite/both (default: {DEFAULT_DB_PATH})')
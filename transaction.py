@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+import sys
+import math
+from array import array
+
+# Column order of the CSV output
+FIELDNAMES = ['transaction_date', 'posting_date', 'description', 'amount',
+              'foreign_amount', 'foreign_currency', 'exchange_rate']
+
+# Marks a missing value in integer columns
+_NO_DATE = -1
+
+def parse_cents(amount_str):
+    """Convert an amount string like '-1,234.56' or '$12.3' to integer cents without using floats."""
+    amount_str = amount_str.replace('$', '').replace(',', '').strip()
+    negative = amount_str.startswith('-')
+    if negative:
+        amount_str = amount_str[1:]
+    whole, _, fraction = amount_str.partition('.')
+    if not whole and not fraction:
+        raise ValueError(f"Not an amount: '{amount_str}'")
+    fraction = (fraction + '000')[:3]
+    cents = int(whole or '0') * 100 + int(fraction[:2])
+    if int(fraction[2]) >= 5:
+        cents += 1
+    return -cents if negative else cents
+
+def to_cents(amount):
+    """Convert a float dollar amount to integer cents."""
+    return int(round(amount * 100))
+
+def format_cents(cents):
+    """Format integer cents the way the CSV output always has (a plain float, e.g. '12.5')."""
+    return str(cents / 100)
+
+def _date_to_int(date_str):
+    """Pack an ISO date into an int like 20240115, or None if it isn't one."""
+    if len(date_str) == 10 and date_str[4] == '-' and date_str[7] == '-':
+        try:
+            return int(date_str[:4] + date_str[5:7] + date_str[8:])
+        except ValueError:
+            return None
+    return None
+
+def _int_to_date(value):
+    return f"{value // 10000:04d}-{value // 100 % 100:02d}-{value % 100:02d}"
+
+class Transaction:
+    """A single transaction with the account-currency amount held as integer cents.
+
+    Uses __slots__, so each instance is a fraction of the size of the dict
+    extract_transactions produces. Foreign amounts and exchange rates stay
+    floats, since they are in whatever currency the purchase was made in and
+    are never totalled.
+    """
+
+    __slots__ = ('transaction_date', 'posting_date', 'description', 'amount_cents',
+                 'foreign_amount', 'foreign_currency', 'exchange_rate', 'section')
+
+    def __init__(self, transaction_date, posting_date, description, amount_cents,
+                 foreign_amount=None, foreign_currency=None, exchange_rate=None, section=None):
+        self.transaction_date = transaction_date
+        self.posting_date = posting_date
+        self.description = description
+        self.amount_cents = amount_cents
+        self.foreign_amount = foreign_amount
+        self.foreign_currency = foreign_currency
+        self.exchange_rate = exchange_rate
+        self.section = section
+
+    @classmethod
+    def from_dict(cls, transaction):
+        """Build a Transaction from the dict shape extract_transactions returns."""
+        return cls(transaction['transaction_date'], transaction['posting_date'],
+                   transaction['description'], to_cents(transaction['amount']),
+                   transaction.get('foreign_amount'), transaction.get('foreign_currency'),
+                   transaction.get('exchange_rate'), transaction.get('section'))
+
+    @property
+    def amount(self):
+        return self.amount_cents / 100
+
+    def to_dict(self):
+        """Return the dict shape extract_transactions returns, with a float amount."""
+        return {
+            'transaction_date': self.transaction_date,
+            'posting_date': self.posting_date,
+            'description': self.description,
+            'amount': self.amount,
+            'foreign_amount': self.foreign_amount,
+            'foreign_currency': self.foreign_currency,
+            'exchange_rate': self.exchange_rate,
+            'section': self.section
+        }
+
+    def __eq__(self, other):
+        if not isinstance(other, Transaction):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        return (f"Transaction({self.transaction_date!r}, {self.posting_date!r}, "
+                f"{self.description!r}, {self.amount_cents!r})")
+
+class TransactionBatch:
+    """Columnar store for many transactions.
+
+    Dates are packed into int arrays (20240115), amounts into an array of
+    integer cents, and currency codes and section types are interned into
+    small code arrays. Descriptions are interned strings, since the same
+    merchants repeat. Holding millions of transactions this way costs a few
+    dozen bytes each instead of a dict per row, and totals are exact.
+    """
+
+    def __init__(self):
+        self.transaction_dates = array('l')
+        self.posting_dates = array('l')
+        self.amounts = array('q')
+        self.foreign_amounts = array('d')
+        self.exchange_rates = array('d')
+        self.currency_codes = array('H')
+        self.section_codes = array('H')
+        self.descriptions = []
+        # Index 0 is reserved for None in the interned value tables
+        self.currencies = [None]
+        self.sections = [None]
+        self._currency_index = {None: 0}
+        self._section_index = {None: 0}
+        # Dates that aren't ISO dates (e.g. unparseable tokens), by row and column
+        self._raw_dates = {}
+
+    @classmethod
+    def from_iterable(cls, transactions):
+        """Build a batch from dicts or Transactions, e.g. straight from iter_transactions."""
+        batch = cls()
+        batch.extend(transactions)
+        return batch
+
+    def __len__(self):
+        return len(self.amounts)
+
+    def _intern(self, value, table, index):
+        code = index.get(value)
+        if code is None:
+            code = len(table)
+            table.append(value)
+            index[value] = code
+        return code
+
+    def _pack_date(self, row, column, date_str):
+        value = _date_to_int(date_str) if date_str is not None else None
+        if value is None:
+            self._raw_dates[(row, column)] = date_str
+            return _NO_DATE
+        return value
+
+    def append(self, transaction):
+        """Add a Transaction or a transaction dict."""
+        if isinstance(transaction, dict):
+            transaction = Transaction.from_dict(transaction)
+        row = len(self)
+        self.transaction_dates.append(self._pack_date(row, 0, transaction.transaction_date))
+        self.posting_dates.append(self._pack_date(row, 1, transaction.posting_date))
+        self.amounts.append(transaction.amount_cents)
+        self.foreign_amounts.append(math.nan if transaction.foreign_amount is None
+                                    else transaction.foreign_amount)
+        self.exchange_rates.append(math.nan if transaction.exchange_rate is None
+                                   else transaction.exchange_rate)
+        self.currency_codes.append(self._intern(transaction.foreign_currency, self.currencies,
+                                                self._currency_index))
+        self.section_codes.append(self._intern(transaction.section, self.sections, self._section_index))
+        self.descriptions.append(sys.intern(transaction.description))
+
+    def extend(self, transactions):
+        for transaction in transactions:
+            self.append(transaction)
+
+    def _date(self, row, column, value):
+        return self._raw_dates[(row, column)] if value == _NO_DATE else _int_to_date(value)
+
+    def __getitem__(self, row):
+        if row < 0:
+            row += len(self)
+        foreign_amount = self.foreign_amounts[row]
+        exchange_rate = self.exchange_rates[row]
+        return Transaction(
+            self._date(row, 0, self.transaction_dates[row]),
+            self._date(row, 1, self.posting_dates[row]),
+            self.descriptions[row],
+            self.amounts[row],
+            None if math.isnan(foreign_amount) else foreign_amount,
+            self.currencies[self.currency_codes[row]],
+            None if math.isnan(exchange_rate) else exchange_rate,
+            self.sections[self.section_codes[row]])
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self[row]
+
+    def total_cents(self):
+        """Exact sum of all amounts in cents."""
+        return sum(self.amounts)
+
+    def to_dicts(self):
+        """Return the rows in the dict shape extract_transactions returns."""
+        return [transaction.to_dict() for transaction in self]
+
+    def rows(self):
+        """Yield each transaction as a CSV row in FIELDNAMES order."""
+        for row in range(len(self)):
+            foreign_amount = self.foreign_amounts[row]
+            exchange_rate = self.exchange_rates[row]
+            yield (self._date(row, 0, self.transaction_dates[row]),
+                   self._date(row, 1, self.posting_dates[row]),
+                   self.descriptions[row],
+                   format_cents(self.amounts[row]),
+                   '' if math.isnan(foreign_amount) else foreign_amount,
+                   self.currencies[self.currency_codes[row]] or '',
+                   '' if math.isnan(exchange_rate) else exchange_rate)
+
+    def writerows(self, writer):
+        """Write every row with a csv.writer in one bulk call."""
+        writer.writerows(self.rows())
+
+    def sorted_by_date(self):
+        """Return a new batch sorted by transaction date, keeping document order for ties."""
+        order = sorted(range(len(self)), key=lambda row: self._date(row, 0, self.transaction_dates[row]))
+        batch = TransactionBatch()
+        batch.extend(self[row] for row in order)
+        return batch
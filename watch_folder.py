@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""Watch the input directory and convert statements as soon as they land.
+
+Used by `process_all_pdfs.py --watch`. New PDFs are noticed through inotify
+on Linux, or by polling the directory's modification time elsewhere, so the
+directory is never rescanned on a timer. A file is converted once its size
+and mtime have stopped changing, and the combined ledger is updated with
+each batch of finished files.
+"""
+import os
+import time
+import errno
+import select
+import signal
+import struct
+import ctypes
+import ctypes.util
+
+from process_all_pdfs import convert_pdf, conversion_options
+from extract_backends import get_backend
+from pdf_to_csv import PARSER_VERSION
+from sqlite_sink import DEFAULT_DB_PATH
+from manifest import load_manifest, manifest_path, plan_incremental, record_conversion, save_manifest
+from combine_csv_files import combine_csv_files, merge_into_combined
+
+# Seconds a file's size and mtime must stay unchanged before it is converted
+DEFAULT_SETTLE = 2.0
+DEFAULT_POLL_INTERVAL = 1.0
+# Longest wait for filesystem events between housekeeping passes
+TICK = 0.5
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct('iIII')
+
+class InotifyWatcher:
+    """Report files created, written or moved into a directory, using Linux inotify through ctypes."""
+
+    def __init__(self, directory):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError(errno.ENOSYS, "inotify is not available")
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = IN_CREATE | IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, f"Cannot watch {directory}")
+
+    def wait(self, timeout):
+        """Return the names of changed files, or None if events were lost and the directory must be listed."""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        names = set()
+        offset = 0
+        while offset < len(data):
+            _, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            if mask & IN_Q_OVERFLOW:
+                return None
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if name:
+                names.add(os.fsdecode(name))
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+class PollingWatcher:
+    """Fallback watcher: lists the directory only when its modification time changes.
+
+    A directory's mtime changes when files are created, deleted or renamed in
+    it, but not when an existing file is rewritten in place, so in-place
+    rewrites of already converted files are only picked up by inotify.
+    """
+
+    def __init__(self, directory, interval=DEFAULT_POLL_INTERVAL):
+        self.directory = directory
+        self.interval = interval
+        self._mtime = os.stat(directory).st_mtime_ns
+
+    def wait(self, timeout):
+        time.sleep(min(timeout, self.interval))
+        mtime = os.stat(self.directory).st_mtime_ns
+        if mtime == self._mtime:
+            return set()
+        self._mtime = mtime
+        return None
+
+    def close(self):
+        pass
+
+def open_watcher(directory, use_inotify=True, poll_interval=DEFAULT_POLL_INTERVAL):
+    """Return an inotify watcher if possible, otherwise a polling one."""
+    if use_inotify:
+        try:
+            return InotifyWatcher(directory)
+        except (OSError, AttributeError) as e:
+            print(f"inotify unavailable ({e}), polling {directory} instead.")
+    return PollingWatcher(directory, poll_interval)
+
+def watch(input_dir="in", output_dir="out", thorough=False, verbose=False, jobs=None, cache=None,
+          sink='csv', db_path=DEFAULT_DB_PATH, prefilter=False, settle=DEFAULT_SETTLE,
+          use_inotify=True, poll_interval=DEFAULT_POLL_INTERVAL, combine=True, backend=None, dedupe='flag'):
+    """Convert PDFs as they arrive in input_dir until interrupted.
+
+    Files already in input_dir that are new or changed according to the
+    manifest are converted first. After that, only files reported by the
+    watcher are looked at. Each file waits until its size and mtime have not
+    changed for ``settle`` seconds, then goes to a pool of ``jobs`` worker
+    processes. CSV outputs are written atomically, and with ``combine`` each
+    batch of finished files is merged into combined.csv in output_dir (a full
+    rebuild is done instead when a previously converted statement changed).
+    ``dedupe`` ('flag', 'drop' or None) checks the merged rows for
+    transactions repeated by overlapping statements, as combine_csv_files
+    does. ``backend`` names the PDF text extraction backend. If a worker dies and
+    breaks the pool, the pool is rebuilt and the files it was converting are
+    queued again and converted one at a time, so only a file that kills its
+    worker on its own is given up on. Conversions still running when the
+    watch stops are waited for and recorded.
+    """
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+    from concurrent.futures.process import BrokenProcessPool
+
+    os.makedirs(output_dir, exist_ok=True)
+    backend = get_backend(backend).name
+    options = conversion_options(thorough, sink, prefilter, backend)
+    manifest = load_manifest(manifest_path(output_dir))
+    combine = combine and sink in ('csv', 'both')
+    combined_file = os.path.join(output_dir, 'combined.csv')
+
+    pending = {}    # path -> ((size, mtime), time first seen with that signature)
+    in_flight = {}  # future -> (path, fingerprint)
+    rerun = set()   # paths changed again while being converted
+    suspects = set()  # paths in flight when the pool broke, converted alone until cleared
+
+    def consider(names):
+        for name in names:
+            if not name.lower().endswith('.pdf'):
+                continue
+            path = os.path.join(input_dir, name)
+            if path in pending:
+                continue
+            if any(path == flight[0] for flight in in_flight.values()):
+                rerun.add(path)
+                continue
+            if not os.path.isfile(path):
+                continue
+            to_convert, _, _ = plan_incremental([path], manifest, PARSER_VERSION, options)
+            if to_convert:
+                pending[path] = (None, None)
+
+    def list_input_dir():
+        return [entry.name for entry in os.scandir(input_dir) if entry.is_file()]
+
+    def collect(finished):
+        """Record finished conversions and bring the ledger up to date."""
+        added = []
+        rebuild = False
+        recorded = False
+        alone = len(in_flight) == 1
+        for future in finished:
+            path, fingerprint = in_flight.pop(future)
+            filename = os.path.basename(path)
+            try:
+                result = future.result()
+            except BrokenProcessPool:
+                if not alone:
+                    print(f"{filename}: worker pool broke, queueing it again")
+                    suspects.add(path)
+                    rerun.discard(path)
+                    pending[path] = (None, None)
+                    continue
+                result = {'file': path, 'output': None, 'rows': 0, 'duration': 0.0,
+                          'error': "worker process died converting it", 'log': ''}
+            except BaseException as e:
+                # Includes a KeyboardInterrupt the worker got from Ctrl+C
+                result = {'file': path, 'output': None, 'rows': 0, 'duration': 0.0,
+                          'error': f"{type(e).__name__}: {e}", 'log': ''}
+            suspects.discard(path)
+            recorded = True
+            if verbose:
+                print(result['log'], end='')
+            if result['error']:
+                print(f"{filename}: ERROR: {result['error']} ({result['duration']:.2f}s)")
+            else:
+                print(f"{filename}: {result['rows']} rows ({result['duration']:.2f}s)")
+            if result['output']:
+                rebuild = rebuild or filename in manifest['files']
+                record_conversion(manifest, path, PARSER_VERSION, options, result, fingerprint)
+                if result['output'].endswith('.csv'):
+                    added.append(result['output'])
+            if path in rerun:
+                rerun.discard(path)
+                consider([filename])
+        if recorded:
+            save_manifest(manifest, manifest_path(output_dir))
+        if combine and added:
+            if rebuild or not os.path.exists(combined_file):
+                combine_csv_files(output_dir, combined_file, dedupe=dedupe)
+            else:
+                merge_into_combined(added, combined_file, dedupe=dedupe)
+
+    stop = []
+    previous_handler = signal.signal(signal.SIGTERM, lambda signum, frame: stop.append(signum))
+    watcher = open_watcher(input_dir, use_inotify, poll_interval)
+    jobs = jobs or os.cpu_count() or 1
+    print(f"Watching {input_dir} with {jobs} worker(s) ({type(watcher).__name__}). Press Ctrl+C to stop.")
+
+    # Anything that arrived while the daemon was not running
+    consider(list_input_dir())
+
+    executor = ProcessPoolExecutor(max_workers=jobs)
+    try:
+        while not stop:
+            # With work running, wake as soon as it finishes as well as on file events
+            names = watcher.wait(0 if in_flight else TICK)
+            consider(list_input_dir() if names is None else names)
+            if in_flight:
+                wait(list(in_flight), timeout=TICK, return_when=FIRST_COMPLETED)
+
+            # Queue files whose size and mtime have settled
+            now = time.monotonic()
+            for path, (signature, since) in list(pending.items()):
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    del pending[path]
+                    continue
+                current = (stat.st_size, stat.st_mtime)
+                if current != signature:
+                    pending[path] = (current, now)
+                elif now - since >= settle and stat.st_size > 0:
+                    # Until a suspect has run alone, don't start it next to others or others next to it
+                    if in_flight and (path in suspects or any(flight[0] in suspects for flight in in_flight.values())):
+                        continue
+                    fingerprint = {'size': stat.st_size, 'mtime': stat.st_mtime, 'sha256': None}
+                    try:
+                        future = executor.submit(convert_pdf, path, output_dir, thorough, verbose, cache,
+                                                 False, sink, db_path, prefilter, False, backend)
+                    except BrokenProcessPool:
+                        # A worker died; the files it took down come back through collect()
+                        print("Worker pool broke, starting a new one.")
+                        executor.shutdown(wait=False)
+                        executor = ProcessPoolExecutor(max_workers=jobs)
+                        break
+                    del pending[path]
+                    in_flight[future] = (path, fingerprint)
+                    print(f"Queued {os.path.basename(path)}")
+
+            collect([future for future in in_flight if future.done()])
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+        signal.signal(signal.SIGTERM, previous_handler)
+        try:
+            # Let conversions already running finish, and record them so they aren't redone
+            executor.shutdown(wait=True)
+            collect(list(in_flight))
+        finally:
+            save_manifest(manifest, manifest_path(output_dir))
+    print("Stopped watching.")